@@ -1,25 +1,27 @@
 import yaml
-import json
 import asyncio
 import pandas as pd
 from dotenv import load_dotenv
 from rich import print
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from data_schema.schema import CompanyQualifier
+from data_schema.schema import CompanyQualifier, UNCLASSIFIED
+from data_schema.dtypes import read_csv_compact, compact_dtypes
+from ai_filters.llm_clients import LLMClientRegistry, get_llm_registry
+from ai_filters.model_router import ModelRouter
+from ai_filters.deadlines import gather_with_deadline
+from ai_filters.prompt_cache import CachedPrompt
+from ai_filters.company_rules import CompanyRuleEngine
 
 
-new_model = "gemini-2.5-flash-lite"
-old_model = "gemini-2.5-flash-preview-05-20"
-
 class CompanyClassifier:
     def __init__(
             self,
             config_path: str = "config/company_requirements.yml",
-            model_name: str = new_model,
+            model_name: str | None = None,
             temperature: float = 0.1,
-            max_concurrency: int = 60
+            max_concurrency: int = 60,
+            registry: LLMClientRegistry | None = None,
+            use_rule_engine: bool = True
     ):
         load_dotenv()
 
@@ -28,14 +30,9 @@ class CompanyClassifier:
             data = yaml.safe_load(file)
 
         self.instruction_data = data["prompt_v2"]["company_requirements"]
-        self.instruction_json = json.dumps(self.instruction_data, indent=2)
 
-        # Initialize model
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=temperature,
-            max_retries=2
-        )
+        # Local rules settle the clear-cut rows; only the rest are sent to the LLM
+        self.rule_engine = CompanyRuleEngine(config_path) if use_rule_engine else None
 
         # Initialize semaphore for concurrency control
         self.semaphore = asyncio.Semaphore(max_concurrency)
@@ -43,26 +40,20 @@ class CompanyClassifier:
         # Output parser
         self.parser = PydanticOutputParser(pydantic_object=CompanyQualifier)
 
-        # Prompt template
-        self.prompt = PromptTemplate(
-            template="""
-You are an AI agent classifying companies as either "Qualified" or "Disqualified".
-
-Instructions for classification:
-{instruction_json}
-
-Here is the company info:
-{query}
-
-{format_instructions}
-
-Only return the JSON output.
-""",
-            input_variables=["query"],
-            partial_variables={
-                "instruction_json": self.instruction_json,
-                "format_instructions": self.parser.get_format_instructions(),
-            },
+        # Model tiers, cheapest first; clients come from the shared, pooled registry
+        self.registry = registry or get_llm_registry()
+        self.router = ModelRouter(
+            self.registry, "company_classifier", self.parser, model_name=model_name, temperature=temperature
+        )
+        self.stage_timeout = self.registry.deadlines_for("company_classifier").get("stage_timeout_s")
+
+        # Static prefix (instructions + output format) first and byte-stable, so the provider can cache it
+        self.prompt = CachedPrompt(
+            intro='You are an AI agent classifying companies as either "Qualified" or "Disqualified".\n\n'
+                  'Instructions for classification:',
+            instructions=self.instruction_data,
+            format_instructions=self.parser.get_format_instructions() + "\n\nOnly return the JSON output.",
+            query_header="Here is the company info:",
         )
 
     async def classify(self, n_employees: str, company_industry: str, company_location: str) -> str:
@@ -79,35 +70,27 @@ Only return the JSON output.
             )
 
             prompt_str = self.prompt.format(query=company_info)
-            # Use ainvoke for asynchronous model calls
-            output = await self.llm.ainvoke([{"role": "user", "content": prompt_str}])
-            content = output.content.strip() if hasattr(output, "content") else str(output).strip()
-
-            # Clean markdown/codeblock wrappers
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-
+            # Routed through the model tiers with ainvoke
             try:
-                parsed = self.parser.parse(content)
-                label = parsed.label
-                print(
-                    f"[green]Finished classification for: {company_industry}, {n_employees}, {company_location}. Result: {label}[/green]")
-                return label  # Return the label string only
-            except Exception as e:
+                parsed = await self.router.route(prompt_str)
+            except TimeoutError:
+                print(f"[yellow]No answer in time for: {company_industry}, {n_employees}, {company_location}[/yellow]")
+                return UNCLASSIFIED
+
+            if parsed is None:
                 print(
-                    f"[red]Error parsing result for [{company_industry}, {n_employees}, {company_location}]:[/red] {e}")
+                    f"[red]No model tier returned a valid result for ({company_industry}, {n_employees}, {company_location})[/red]")
                 return "Disqualified"  # Fail-safe default
+            print(
+                f"[green]Finished classification for: {company_industry}, {n_employees}, {company_location}. Result: {parsed.label} ({parsed.confidence:.2f})[/green]")
+            return parsed.label  # Return the label string only
 
     async def process_dataset(self, input_csv_path: str, output_csv_path: str) -> None:
         """
         Load CSV, classify companies concurrently, and save the updated file.
+        Given an earlier output, only rows left Unclassified are classified again.
         """
-        df = pd.read_csv(input_csv_path)
+        df = read_csv_compact(input_csv_path, stage="company_classification")
 
         # Clean column names just in case
         df.columns = df.columns.str.strip().str.lower()
@@ -119,21 +102,39 @@ Only return the JSON output.
 
         print(f"[blue]Loaded {len(df)} records from {input_csv_path}[/blue]")
 
-        # Prepare a list of tasks for asyncio.gather
-        tasks = []
-        for idx, row in df.iterrows():
-            industry = str(row["industry"])
-            size = str(row["size"])
-            location = str(row["company_location"])
-            tasks.append(self.classify(size, industry, location))
-
-        print(f"[cyan]Starting concurrent classification tasks on {len(df)} rows...[/cyan]")
-
-        # Run all tasks concurrently and await all results
-        results = await asyncio.gather(*tasks)
+        # Decisions from an earlier run are kept; only missing or Unclassified ones are redone
+        previous = df.pop("is_company_qualified").astype(object) if "is_company_qualified" in df.columns else None
+        if previous is not None:
+            previous = previous.where(previous != UNCLASSIFIED)
+
+        if self.rule_engine:
+            decisions = self.rule_engine.evaluate(df)
+        else:
+            decisions = pd.Series(None, index=df.index, dtype="object")
+        if previous is not None:
+            decisions = previous.fillna(decisions)
+        # The size lookup ran out of time for these rows; unless location or industry already settled
+        # them, nothing can be decided until it is retried
+        size_missing = (df["size"] == UNCLASSIFIED).fillna(False).to_numpy()
+        decisions[size_missing & decisions.isna().to_numpy()] = UNCLASSIFIED
+        pending = df[decisions.isna()]
+        print(f"[cyan]Rule engine (or an earlier run) decided {len(df) - len(pending)} of {len(df)} rows.[/cyan]")
+
+        # Rows sharing the same industry, size and location get the same answer; ask once per combination
+        queries = pending[["size", "industry", "company_location"]].astype(str)
+        unique_queries = list(dict.fromkeys(queries.itertuples(index=False, name=None)))
+        tasks = [self.classify(size, industry, location) for size, industry, location in unique_queries]
+
+        print(f"[cyan]Starting concurrent classification tasks on {len(tasks)} unique company profiles...[/cyan]")
+
+        # Run all tasks concurrently; whatever is still running at the stage deadline stays Unclassified
+        results = dict(zip(unique_queries, await gather_with_deadline(tasks, self.stage_timeout, UNCLASSIFIED)))
 
         # Update the original DataFrame with the results
-        df["Is_company_qualified"] = results
+        decisions.loc[pending.index] = [results[query] for query in queries.itertuples(index=False, name=None)]
+        df["Is_company_qualified"] = decisions
+        compact_dtypes(df)
+        self.router.report()
 
         # Optional: You can filter the DataFrame here if needed
         # df = df[df["Is_company_qualified"] != "Disqualified"]
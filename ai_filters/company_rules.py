@@ -0,0 +1,138 @@
+import re
+import yaml
+import numpy as np
+import pandas as pd
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+|\d+"
+# The whole value must be a size, e.g. "51-200", "51 to 200 Employees", "10,001+ employees";
+# numbers inside free text ("As of 2023-2024 it has ...") are left to the LLM
+SIZE_RANGE_PATTERN = (
+    rf"^\s*(?P<low>{_NUMBER})\s*(?:(?:-|–|—|to)\s*(?P<high>{_NUMBER})|(?P<plus>\+))\s*(?:employees)?\s*$"
+)
+# A bare head count such as "250" or "250 employees"
+SIZE_COUNT_PATTERN = rf"^\s*(?P<count>{_NUMBER})\s*(?:employees)?\s*$"
+# Optional ZIP code and country after a state code: "Austin, TX 78701, US"
+_STATE_CODE_SUFFIX = r"(?:\s+\d{5}(?:-\d{4})?)?"
+_US_SUFFIX = r"\s*,\s*(?:US|USA|United States)"
+
+
+def _terms_pattern(terms: list[str]) -> str:
+    """Compile a list of terms into one case-insensitive alternation that only matches whole words."""
+    alternation = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return rf"(?<!\w)(?i:{alternation})(?!\w)"
+
+
+class CompanyRuleEngine:
+    """
+    Decides the mechanical company requirements locally, over a whole DataFrame at once.
+
+    Each rule gives pass / fail / unknown per row. A row is Disqualified when any rule fails,
+    Qualified when all rules pass, and left undecided (None) for the LLM otherwise.
+    """
+
+    def __init__(self, config_path: str = "config/company_requirements.yml"):
+        with open(config_path, "r") as file:
+            data = yaml.safe_load(file)
+
+        requirements = data["prompt_v2"]["company_requirements"]
+        rules = data["rule_engine"]
+
+        low, high = str(requirements["employee_headcount"]["range"]).split("-")
+        self.min_employees, self.max_employees = int(low), int(high)
+
+        # Case-sensitive codes: "US" as a whole word; state codes only at the end of the value or before
+        # ", US". Codes that are also country codes ("Tel Aviv, IL") additionally need a ZIP or ", US".
+        # State names that are also countries ("Tbilisi, Georgia") are treated like the ambiguous codes.
+        ambiguous = set(rules.get("ambiguous_state_codes", []))
+        state_codes = "|".join(code for code in rules["usa_state_codes"] if code not in ambiguous)
+        ambiguous_codes = "|".join(sorted(ambiguous))
+        ambiguous_names = {name.lower() for name in rules.get("ambiguous_state_names", [])}
+        usa_terms = [term for term in rules["usa_location_terms"] if term.lower() not in ambiguous_names]
+        usa_patterns = [
+            _terms_pattern(usa_terms),
+            rf"(?<!\w)(?:{'|'.join(rules.get('usa_country_codes', []))})(?!\w)",
+            rf",\s*(?:{state_codes}){_STATE_CODE_SUFFIX}(?:{_US_SUFFIX})?\s*$",
+        ]
+        if ambiguous_codes:
+            usa_patterns += [
+                rf",\s*(?:{ambiguous_codes})\s+\d{{5}}(?:-\d{{4}})?(?:{_US_SUFFIX})?\s*$",
+                rf",\s*(?:{ambiguous_codes}){_STATE_CODE_SUFFIX}{_US_SUFFIX}\s*$",
+            ]
+        if ambiguous_names:
+            usa_patterns.append(
+                rf"{_terms_pattern(ambiguous_names)}(?:\s+\d{{5}}(?:-\d{{4}})?|{_US_SUFFIX})(?!\w)"
+            )
+        self.usa_location_pattern = "|".join(usa_patterns)
+        self.non_usa_location_pattern = _terms_pattern(rules["non_usa_location_terms"])
+        self.qualified_industry_pattern = _terms_pattern(rules["qualified_industry_terms"])
+        self.disqualified_industry_pattern = _terms_pattern(rules["disqualified_industry_terms"])
+
+    @staticmethod
+    def _present(values: pd.Series) -> pd.Series:
+        return values.notna() & (values.astype("string").str.strip() != "")
+
+    def parse_sizes(self, sizes: pd.Series) -> pd.DataFrame:
+        """Normalize size strings into numeric 'low'/'high' columns (NaN when not parseable)."""
+        text = sizes.astype("string")
+        ranges = text.str.extract(SIZE_RANGE_PATTERN, flags=re.IGNORECASE)
+        counts = text.str.extract(SIZE_COUNT_PATTERN, flags=re.IGNORECASE)
+
+        def to_number(column: pd.Series) -> pd.Series:
+            return pd.to_numeric(column.str.replace(",", "", regex=False), errors="coerce").astype("float64")
+
+        low = to_number(ranges["low"]).fillna(to_number(counts["count"]))
+        high = to_number(ranges["high"])
+        high = high.mask(ranges["plus"].notna(), np.inf).fillna(to_number(counts["count"]))
+        return pd.DataFrame({"low": low, "high": high}, index=sizes.index)
+
+    def _headcount_rule(self, sizes: pd.Series) -> pd.Series:
+        parsed = self.parse_sizes(sizes)
+        passes = (parsed["low"] >= self.min_employees) & (parsed["high"] <= self.max_employees)
+        fails = (parsed["high"] < self.min_employees) | (parsed["low"] > self.max_employees)
+        # Config: "If this information is not available, assume this is unqualified"
+        fails |= ~self._present(sizes)
+        return self._combine(passes, fails)
+
+    def _location_rule(self, locations: pd.Series) -> pd.Series:
+        text = locations.astype("string")
+        usa = text.str.contains(self.usa_location_pattern, regex=True).fillna(False).astype(bool)
+        non_usa = text.str.contains(self.non_usa_location_pattern, regex=True).fillna(False).astype(bool)
+        # "New Mexico"-style overlaps match both tables and are left to the LLM
+        passes = usa & ~non_usa
+        fails = (non_usa & ~usa) | ~self._present(locations)
+        return self._combine(passes, fails)
+
+    def _industry_rule(self, industries: pd.Series) -> pd.Series:
+        text = industries.astype("string")
+        qualified = text.str.contains(self.qualified_industry_pattern, regex=True).fillna(False).astype(bool)
+        disqualified = text.str.contains(self.disqualified_industry_pattern, regex=True).fillna(False).astype(bool)
+        return self._combine(qualified & ~disqualified, disqualified & ~qualified)
+
+    @staticmethod
+    def _combine(passes: pd.Series, fails: pd.Series) -> pd.Series:
+        """Encode a rule as 1 (pass), 0 (fail) or NaN (unknown)."""
+        result = pd.Series(np.nan, index=passes.index)
+        result[passes] = 1
+        result[fails] = 0
+        return result
+
+    def evaluate(
+            self,
+            df: pd.DataFrame,
+            size_col: str = "size",
+            industry_col: str = "industry",
+            location_col: str = "company_location",
+    ) -> pd.Series:
+        """Return 'Qualified', 'Disqualified' or None (needs the LLM) for every row."""
+        rules = pd.concat(
+            [
+                self._headcount_rule(df[size_col]),
+                self._location_rule(df[location_col]),
+                self._industry_rule(df[industry_col]),
+            ],
+            axis=1,
+        )
+        decisions = pd.Series(None, index=df.index, dtype="object")
+        decisions[(rules == 1).all(axis=1)] = "Qualified"
+        decisions[(rules == 0).any(axis=1)] = "Disqualified"
+        return decisions
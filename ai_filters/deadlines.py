@@ -0,0 +1,128 @@
+import time
+import asyncio
+from collections import Counter, deque
+from typing import Awaitable, Callable, Iterable, TypeVar
+from rich import print
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Runs a call with a deadline, hedging stragglers.
+
+    When a call is still running after the configured percentile of recent latencies, one
+    duplicate is started; the first successful response wins and the other is cancelled.
+    Hedges are capped at ``budget`` of all calls. A call with no answer by ``call_timeout``
+    raises TimeoutError.
+    """
+
+    def __init__(
+            self,
+            call_timeout: float = 45.0,
+            percentile: float = 95,
+            min_samples: int = 20,
+            min_delay_s: float = 2.0,
+            budget: float = 0.1,
+            window: int = 500,
+    ):
+        self.call_timeout = call_timeout
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay_s
+        self.budget = budget
+        self.latencies = deque(maxlen=window)
+        self.stats = Counter()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Hedger":
+        return cls(
+            call_timeout=config.get("call_timeout_s", 45.0),
+            percentile=config.get("percentile", 95),
+            min_samples=config.get("min_samples", 20),
+            min_delay_s=config.get("min_delay_s", 2.0),
+            budget=config.get("budget", 0.1),
+        )
+
+    def hedge_delay(self) -> float | None:
+        """Seconds after which a call is hedged, or None until enough latencies were seen."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    async def _timed(self, make_call: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        result = await make_call()
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    async def run(self, make_call: Callable[[], Awaitable[T]]) -> T:
+        """Await make_call() (called again for the hedge) and return the first successful result."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.call_timeout
+        self.stats["calls"] += 1
+
+        primary = asyncio.ensure_future(self._timed(make_call))
+        started = [primary]
+        pending = {primary}
+        error = None
+        try:
+            delay = self.hedge_delay()
+            if delay is not None and delay < self.call_timeout:
+                done, pending = await asyncio.wait(pending, timeout=delay)
+                if not done and self.stats["hedged"] < self.budget * self.stats["calls"]:
+                    self.stats["hedged"] += 1
+                    hedge = asyncio.ensure_future(self._timed(make_call))
+                    started.append(hedge)
+                    pending.add(hedge)
+                elif done:
+                    pending = done
+
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+
+            if not pending and error is not None:
+                raise error
+            self.stats["timeouts"] += 1
+            # Count the abandoned call at the deadline so the percentile keeps seeing slow calls
+            self.latencies.append(self.call_timeout)
+            raise TimeoutError(f"No response within {self.call_timeout:g}s")
+        finally:
+            for task in started:
+                if not task.done():
+                    task.cancel()
+
+    def summary(self) -> str:
+        return (
+            f"{self.stats['calls']} calls, {self.stats['hedged']} hedged "
+            f"({self.stats['hedge_wins']} hedges won), {self.stats['timeouts']} timed out"
+        )
+
+
+async def gather_with_deadline(coros: Iterable[Awaitable[T]], timeout: float | None, default: T) -> list[T]:
+    """
+    Like asyncio.gather, but results still missing after timeout seconds are cancelled and
+    returned as default, so one stage cannot be held up by its slowest rows.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    if not tasks:
+        return []
+
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        print(f"[yellow]Stage deadline of {timeout:g}s reached, {len(pending)} of {len(tasks)} calls left as {default}.[/yellow]")
+    return [default if task in pending else task.result() for task in tasks]
@@ -1,22 +1,22 @@
-import json
 import yaml
 import asyncio
 import pandas as pd
 from rich import print
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from dotenv import load_dotenv
-from data_schema.schema import JobQualifier
+from data_schema.schema import JobQualifier, UNCLASSIFIED
+from data_schema.dtypes import compact_dtypes
+from ai_filters.llm_clients import LLMClientRegistry, get_llm_registry
+from ai_filters.model_router import ModelRouter
+from ai_filters.deadlines import gather_with_deadline
+from ai_filters.prompt_cache import CachedPrompt
 
 load_dotenv()
 
-new_model = "gemini-2.5-flash-lite"
-old_model = "gemini-2.5-flash-preview-05-20"
-
 class JobClassifier:
     def __init__(self, yaml_path: str = "config/job_qualification.yml", limit_rows: int | None = 10,
-                 max_concurrency: int = 60):
+                 max_concurrency: int = 60, model_name: str | None = None,
+                 registry: LLMClientRegistry | None = None):
         # ✅ limit_rows is configurable for testing
         self.limit_rows = limit_rows
         self.semaphore = asyncio.Semaphore(max_concurrency)
@@ -26,29 +26,21 @@ class JobClassifier:
             data = yaml.safe_load(file)
 
         job_post_analysis = data["prompt_v2"]["job_post_analysis"]
-        instruction_json = json.dumps(job_post_analysis, indent=2)
-
-        # LLM Model setup
-        self.llm = ChatGoogleGenerativeAI(
-            model=new_model,
-            temperature=0.1,
-            max_retries=2
-        )
 
         # Output parser
         self.parser = PydanticOutputParser(pydantic_object=JobQualifier)
 
-        # Prompt template
-        self.prompt = PromptTemplate(
-            template=(
-                "You are an AI agent. Use the following JSON configuration to analyze job posts.\n"
-                "{instruction_json}\n\nHere is the job post:\n{query}\n\n{format_instructions}\n"
-            ),
-            input_variables=["query"],
-            partial_variables={
-                "instruction_json": instruction_json,
-                "format_instructions": self.parser.get_format_instructions(),
-            },
+        # LLM Model setup: a cheap tier first, escalating uncertain answers (clients come from the pooled registry)
+        self.registry = registry or get_llm_registry()
+        self.router = ModelRouter(self.registry, "job_classifier", self.parser, model_name=model_name)
+        self.stage_timeout = self.registry.deadlines_for("job_classifier").get("stage_timeout_s")
+
+        # Static prefix (instructions + output format) first and byte-stable, so the provider can cache it
+        self.prompt = CachedPrompt(
+            intro="You are an AI agent. Use the following JSON configuration to analyze job posts.",
+            instructions=job_post_analysis,
+            format_instructions=self.parser.get_format_instructions(),
+            query_header="Here is the job post:",
         )
 
     async def classify_job(self, job_post: str) -> str:
@@ -57,29 +49,18 @@ class JobClassifier:
             print(f"[yellow]Starting classification for a job post of length {len(job_post)}...[/yellow]")
             prompt_str = self.prompt.format(query=job_post)
 
-            # Use ainvoke for asynchronous model calls
-            output = await self.llm.ainvoke([{"role": "user", "content": prompt_str}])
-
-            content = output.content if hasattr(output, "content") else output
-            content = content.strip()
-
-            # Clean up JSON markers if present
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-
+            # Routed through the model tiers with ainvoke
             try:
-                parsed = self.parser.parse(content)
-                print(f"[green]Finished classification. Result: {parsed.label}[/green]")
-                return parsed.label  # JobQualifier must have 'label'
-            except Exception as e:
-                print("[yellow]Could not parse output as JobQualifier. Raw output:[/yellow]")
-                print("[red]Error:[/red]", e)
+                parsed = await self.router.route(prompt_str)
+            except TimeoutError:
+                print(f"[yellow]No answer in time, left as {UNCLASSIFIED}.[/yellow]")
+                return UNCLASSIFIED
+
+            if parsed is None:
+                print("[red]No model tier returned a valid JobQualifier.[/red]")
                 return "Disqualified"  # fallback if parsing fails
+            print(f"[green]Finished classification. Result: {parsed.label} ({parsed.confidence:.2f})[/green]")
+            return parsed.label  # JobQualifier must have 'label'
 
     def _format_job_post(self, title: str, description: str, job_type: str, salary: str) -> str:
         """Formats job details into a structured prompt text."""
@@ -98,7 +79,10 @@ class JobClassifier:
         1. Combines job info into formatted text
         2. Classifies each job concurrently
         3. Adds 'label' column
-        4. Removes 'job_post' column
+
+        Rows left Unclassified by an earlier run's deadline keep their place; passing that output back
+        in only classifies those rows (and any without a label).
+        Rows still waiting when the stage deadline passes are labelled Unclassified.
         """
         required_columns = ["job_title", "job_description", "job_type", "salary"]
         for col in required_columns:
@@ -111,25 +95,30 @@ class JobClassifier:
 
         print(f"[cyan]Job Qualification in progress. Processing {len(df)} rows...[/cyan]")
 
-        # Create formatted job_post column
-        df["job_post"] = df.apply(
-            lambda row: self._format_job_post(
-                row["job_title"], row["job_description"], row["job_type"], row["salary"]
-            ),
-            axis=1
-        )
+        if "label" in df.columns:
+            labels = df["label"].astype(object)
+            pending = labels.isna() | (labels == UNCLASSIFIED)
+            print(f"[cyan]Retrying {pending.sum()} unclassified rows.[/cyan]")
+        else:
+            labels = pd.Series(None, index=df.index, dtype="object")
+            pending = pd.Series(True, index=df.index)
 
-        # ✅ Run all job classifications concurrently using a gather
-        tasks = [self.classify_job(post) for post in df["job_post"]]
-        labels = await asyncio.gather(*tasks)
+        # Format the job info of every pending row
+        job_posts = [
+            self._format_job_post(title, description, job_type, salary)
+            for title, description, job_type, salary in df.loc[pending, required_columns].itertuples(index=False)
+        ]
+
+        # ✅ Run all job classifications concurrently, under the stage deadline
+        tasks = [self.classify_job(post) for post in job_posts]
+        labels[pending] = await gather_with_deadline(tasks, self.stage_timeout, UNCLASSIFIED)
 
         # Add labels
         df["label"] = labels
-
-
-        df.drop(columns=["job_post"], inplace=True)
+        compact_dtypes(df)
 
         removed_count = len(df[df["label"] == "Disqualified"])
 
         print(f"[green]Job qualification done,[/green] [bold]{removed_count}[/bold] unqualified jobs were found.")
+        self.router.report()
         return df
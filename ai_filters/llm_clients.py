@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import yaml
+from rich import print
+from dotenv import load_dotenv
+from google.auth import api_key
+from google.ai.generativelanguage_v1beta import GenerativeServiceAsyncClient
+from google.ai.generativelanguage_v1beta.services.generative_service.transports import (
+    GenerativeServiceGrpcAsyncIOTransport,
+)
+from langchain_google_genai import ChatGoogleGenerativeAI
+# Private helper and client attributes of langchain-google-genai 2.x; pyproject pins it below 3
+from langchain_google_genai._common import get_client_info
+
+
+class LLMClientRegistry:
+    """
+    Hands out shared Gemini clients so every stage reuses the same warm gRPC channels.
+
+    Clients are keyed by (model, temperature, max_retries). Each key owns a small pool of
+    ``ChatGoogleGenerativeAI`` instances, one HTTP/2 channel each, handed out round-robin.
+    """
+
+    def __init__(self, config_path: str = "config/llm_clients.yml"):
+        load_dotenv()
+
+        with open(config_path, "r") as file:
+            data = yaml.safe_load(file)
+
+        self.models = data["models"]
+        self.routing = data.get("routing", {})
+        self.deadlines = data.get("deadlines", {})
+        connection = data.get("connection", {})
+        self.pool_size = max(1, connection.get("pool_size", 1))
+        self.warm_up_enabled = connection.get("warm_up", False)
+        self.channel_options = [
+            ("grpc.keepalive_time_ms", connection.get("keepalive_time_ms", 30000)),
+            ("grpc.keepalive_timeout_ms", connection.get("keepalive_timeout_ms", 10000)),
+            ("grpc.keepalive_permit_without_calls", int(connection.get("keepalive_permit_without_calls", True))),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+
+        self._pools: dict[tuple, list[ChatGoogleGenerativeAI]] = {}
+        self._cursors: dict[tuple, itertools.cycle] = {}
+
+    def model_for(self, stage: str) -> str:
+        """Return the configured model name for a pipeline stage (e.g. 'job_classifier')."""
+        return self.models[stage]
+
+    def tiers_for(self, stage: str) -> tuple[list[str], float]:
+        """Return the escalation tiers (cheapest first) and the confidence threshold for a stage."""
+        routing = self.routing.get(stage)
+        if not routing:
+            return [self.model_for(stage)], 0.0
+        return list(routing["tiers"]), float(routing.get("min_confidence", 0.0))
+
+    def deadlines_for(self, stage: str) -> dict:
+        """Return the stage's call/stage timeouts merged with the shared hedging settings."""
+        return {**self.deadlines.get("hedging", {}), **self.deadlines.get(stage, {})}
+
+    def _stage_models(self) -> set[str]:
+        models = set(self.models.values())
+        for routing in self.routing.values():
+            models.update(routing["tiers"])
+        return models
+
+    def get(self, model_name: str, temperature: float = 0.1, max_retries: int = 2) -> ChatGoogleGenerativeAI:
+        """Return the next pooled client for this model configuration."""
+        key = (model_name, temperature, max_retries)
+        if key not in self._pools:
+            self._pools[key] = [
+                ChatGoogleGenerativeAI(model=model_name, temperature=temperature, max_retries=max_retries)
+                for _ in range(self.pool_size)
+            ]
+            self._cursors[key] = itertools.cycle(self._pools[key])
+
+        llm = next(self._cursors[key])
+        self._attach_async_client(llm)
+        return llm
+
+    def _attach_async_client(self, llm: ChatGoogleGenerativeAI) -> None:
+        """Give the client an async gRPC channel with our keep-alive options (needs a running loop)."""
+        if llm.async_client_running is not None:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # grpc.aio channels bind to the running loop; langchain builds its own default later.
+            return
+
+        credentials = None
+        if llm.google_api_key:
+            credentials = api_key.Credentials(llm.google_api_key.get_secret_value())
+
+        def channel_factory(host, **kwargs):
+            kwargs["options"] = [*kwargs.get("options", []), *self.channel_options]
+            return GenerativeServiceGrpcAsyncIOTransport.create_channel(host, **kwargs)
+
+        transport = GenerativeServiceGrpcAsyncIOTransport(credentials=credentials, channel=channel_factory)
+        llm.async_client_running = GenerativeServiceAsyncClient(
+            transport=transport,
+            client_info=get_client_info(f"ChatGoogleGenerativeAI:{llm.model}"),
+        )
+
+    async def warm_up(self, timeout: float = 10.0) -> None:
+        """Open every pooled channel for the configured stage models before the first request."""
+        if not self.warm_up_enabled:
+            return
+
+        channels = []
+        for model_name in self._stage_models():
+            for _ in range(self.pool_size):
+                llm = self.get(model_name)
+                channels.append(llm.async_client_running.transport.grpc_channel.channel_ready())
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*channels), timeout=timeout)
+            print(f"[green]Warmed up {len(channels)} LLM connections.[/green]")
+        except Exception as e:
+            print(f"[yellow]LLM warm-up did not finish, continuing with cold connections:[/yellow] {e!r}")
+
+    async def aclose(self) -> None:
+        """Close every pooled channel. Clients can be rebuilt afterwards on a new event loop."""
+        for pool in self._pools.values():
+            for llm in pool:
+                if llm.async_client_running is not None:
+                    await llm.async_client_running.transport.close()
+                    llm.async_client_running = None
+                llm.client.transport.close()
+        self._pools.clear()
+        self._cursors.clear()
+
+
+_registry: LLMClientRegistry | None = None
+
+
+def get_llm_registry(config_path: str = "config/llm_clients.yml") -> LLMClientRegistry:
+    """Return the process-wide client registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        _registry = LLMClientRegistry(config_path)
+    return _registry
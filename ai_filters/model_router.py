@@ -0,0 +1,128 @@
+import time
+from collections import defaultdict
+from rich import print
+from langchain.output_parsers import PydanticOutputParser
+from ai_filters.llm_clients import LLMClientRegistry
+from ai_filters.deadlines import Hedger
+from ai_filters.prompt_cache import TokenUsage
+
+
+class ModelRouter:
+    """
+    Sends each prompt to the cheapest model tier first and escalates to the next, stronger tier
+    only when the answer fails the output schema or reports a confidence below the threshold.
+
+    Each call runs under the stage's per-call deadline and is hedged per tier (see Hedger); a tier
+    that times out also escalates. The parser's schema must have a ``confidence`` field. Per-tier
+    call counts, latency and escalations are collected in ``stats`` and printed by ``report()``.
+    """
+
+    def __init__(
+            self,
+            registry: LLMClientRegistry,
+            stage: str,
+            parser: PydanticOutputParser,
+            model_name: str | None = None,
+            temperature: float = 0.1,
+            max_retries: int = 2,
+    ):
+        self.registry = registry
+        self.stage = stage
+        self.parser = parser
+        self.tiers, self.min_confidence = registry.tiers_for(stage)
+        if model_name:
+            # An explicit model replaces the first tier; escalation still goes to the stronger ones
+            self.tiers = [model_name] + [tier for tier in self.tiers[1:] if tier != model_name]
+        self.temperature = temperature
+        self.max_retries = max_retries
+        deadlines = registry.deadlines_for(stage)
+        self.hedgers = {model: Hedger.from_config(deadlines) for model in self.tiers}
+        # Prefix caching is per model, so cached vs. uncached input tokens are tracked per tier
+        self.token_usage = {model: TokenUsage() for model in self.tiers}
+        self.stats = defaultdict(
+            lambda: {"calls": 0, "seconds": 0.0, "schema_failures": 0, "low_confidence": 0, "timeouts": 0}
+        )
+        self.changed_labels = 0
+
+    @staticmethod
+    def _clean_content(output) -> str:
+        """Strip markdown code fences from a model reply."""
+        content = output.content if hasattr(output, "content") else str(output)
+        content = content.strip()
+        if content.startswith("```json"):
+            content = content[7:]
+        if content.startswith("```"):
+            content = content[3:]
+        if content.endswith("```"):
+            content = content[:-3]
+        return content.strip()
+
+    async def route(self, prompt_str: str):
+        """
+        Return the parsed answer of the first tier that is confident enough, or None if no tier parses.
+        Raises TimeoutError when tiers only timed out, so the caller can leave the row unclassified.
+        """
+        messages = [{"role": "user", "content": prompt_str}]
+        answer = None
+        previous_label = None
+        timed_out = False
+        for level, model_name in enumerate(self.tiers):
+            is_last = level == len(self.tiers) - 1
+            stats = self.stats[model_name]
+
+            def make_call(model_name=model_name):
+                # A hedge takes the next pooled client, so it goes out on a different connection
+                llm = self.registry.get(model_name, temperature=self.temperature, max_retries=self.max_retries)
+                return llm.ainvoke(messages)
+
+            start = time.perf_counter()
+            try:
+                output = await self.hedgers[model_name].run(make_call)
+            except TimeoutError:
+                stats["timeouts"] += 1
+                timed_out = True
+                print(f"[yellow]{model_name} did not answer in time{'' if is_last else ', escalating'}.[/yellow]")
+                continue
+            finally:
+                stats["seconds"] += time.perf_counter() - start
+                stats["calls"] += 1
+
+            self.token_usage[model_name].record(output)
+            try:
+                parsed = self.parser.parse(self._clean_content(output))
+            except Exception as e:
+                stats["schema_failures"] += 1
+                print(f"[yellow]{model_name} reply did not match the schema{'' if is_last else ', escalating'}:[/yellow] {e}")
+                continue
+
+            if previous_label is not None and parsed.label != previous_label:
+                self.changed_labels += 1
+            answer = parsed
+            if parsed.confidence >= self.min_confidence or is_last:
+                return answer
+
+            stats["low_confidence"] += 1
+            previous_label = parsed.label
+            print(f"[yellow]{model_name} confidence {parsed.confidence:.2f} for '{parsed.label}', escalating.[/yellow]")
+
+        if answer is None and timed_out:
+            raise TimeoutError(f"No model tier answered in time for {self.stage}")
+        return answer
+
+    def report(self) -> None:
+        """Print per-tier latency and escalation rates."""
+        for model_name in self.tiers:
+            stats = self.stats[model_name]
+            if not stats["calls"]:
+                continue
+            escalated = stats["schema_failures"] + stats["low_confidence"] + stats["timeouts"]
+            print(
+                f"[magenta]Routing ({self.stage}) {model_name}: {stats['calls']} calls, "
+                f"{stats['seconds'] / stats['calls']:.2f}s avg, "
+                f"{escalated / stats['calls']:.0%} not accepted "
+                f"({stats['low_confidence']} low confidence, {stats['schema_failures']} schema failures, "
+                f"{stats['timeouts']} timeouts); {self.hedgers[model_name].summary()}; "
+                f"{self.token_usage[model_name].summary()}[/magenta]"
+            )
+        if self.changed_labels:
+            print(f"[magenta]Routing ({self.stage}) escalation changed {self.changed_labels} labels.[/magenta]")
@@ -0,0 +1,63 @@
+import json
+from collections import Counter
+
+# Gemini caches a request prefix implicitly once it is at least this many tokens long
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def minify_instructions(instructions) -> str:
+    """Compact, deterministic JSON for the instruction block (same input, same bytes, in any process)."""
+    return json.dumps(instructions, separators=(",", ":"), ensure_ascii=False)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for sizing checks, no tokenizer needed."""
+    return len(text) // 4
+
+
+class CachedPrompt:
+    """
+    A prompt split into a static prefix and a per-row suffix.
+
+    The prefix (role, minified instructions and output format) is assembled once and is
+    byte-identical for every call, so the provider can serve it from its prefix cache; only
+    the suffix with the row's data changes. The prefix ends on a blank line, so the suffix
+    always starts a fresh token and cannot shorten the cached run.
+    """
+
+    def __init__(self, intro: str, instructions, format_instructions: str, query_header: str):
+        self.prefix = (
+            f"{intro.strip()}\n\n"
+            f"{minify_instructions(instructions)}\n\n"
+            f"{format_instructions.strip()}\n\n"
+        )
+        self.query_header = query_header.strip()
+
+    def format(self, query: str) -> str:
+        return f"{self.prefix}{self.query_header}\n{query.strip()}\n"
+
+
+def usage_tokens(output) -> tuple[int, int]:
+    """Return (input tokens, input tokens served from the provider cache) of a model reply."""
+    usage = getattr(output, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens", 0) or 0
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    return input_tokens, cached_tokens
+
+
+class TokenUsage:
+    """Cached vs. uncached input tokens across calls."""
+
+    def __init__(self):
+        self.totals = Counter()
+
+    def record(self, output) -> None:
+        input_tokens, cached_tokens = usage_tokens(output)
+        self.totals["calls"] += 1
+        self.totals["input_tokens"] += input_tokens
+        self.totals["cached_tokens"] += cached_tokens
+
+    def summary(self) -> str:
+        input_tokens, cached_tokens = self.totals["input_tokens"], self.totals["cached_tokens"]
+        share = cached_tokens / input_tokens if input_tokens else 0.0
+        return f"{cached_tokens:,} cached / {input_tokens - cached_tokens:,} uncached input tokens ({share:.0%} cached)"
@@ -1,22 +1,82 @@
+import re
+import asyncio
+from collections import Counter
 from typing import Optional
 import pandas as pd
 from rich import print
 from langchain_tavily import TavilySearch
 from langgraph.prebuilt import create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 from pathlib import Path
+from ai_filters.llm_clients import LLMClientRegistry, get_llm_registry
+from ai_filters.deadlines import Hedger, gather_with_deadline
+from data_schema.dtypes import read_csv_compact
+from data_schema.schema import UNCLASSIFIED
 
 
+_NUMBER = r"\d{1,3}(?:,\d{3})+|\d+"
+_RANGE = rf"(?:(?P<low>{_NUMBER})\s*(?:-|–|—|to)\s*(?P<high>{_NUMBER})|(?P<plus>{_NUMBER})\s*\+)"
+_EMPLOYEE_WORDS = r"(?:employees|staff|people|workers)"
+
+# "51-200 employees", "10,001+ employees", "Company size: 1,001-5,000", "over 1,000 employees" (as 1,000+).
+# Bare counts in free text ("Top 10 employees to follow") are not trusted; those go to the extraction call.
+EMPLOYEE_RANGE_PATTERNS = [
+    re.compile(rf"{_RANGE}\s*{_EMPLOYEE_WORDS}", re.IGNORECASE),
+    re.compile(rf"(?:company size|headcount|employees|staff)\s*[:\-]?\s*{_RANGE}", re.IGNORECASE),
+    re.compile(rf"(?:over|more than|above)\s+(?P<plus>{_NUMBER})\s*\+?\s*{_EMPLOYEE_WORDS}", re.IGNORECASE),
+]
+# A model reply that is only a head count, e.g. "250 employees"
+EMPLOYEE_COUNT_ANSWER_PATTERN = re.compile(rf"^\s*(?P<count>{_NUMBER})\s*{_EMPLOYEE_WORDS}?\s*\.?\s*$", re.IGNORECASE)
+# "2019-2023" is a span of years, not a head count
+_YEARS = range(1900, 2101)
+
+# Same source preference the agent prompt asks for: LinkedIn first, then Indeed/Glassdoor
+SOURCE_WEIGHTS = {"linkedin.com": 3, "indeed.com": 2, "glassdoor.com": 2}
+
+
+def _to_int(number: str) -> int:
+    return int(number.replace(",", ""))
+
+
+def _is_year_span(low: str, high: str) -> bool:
+    return all("," not in number and _to_int(number) in _YEARS for number in (low, high))
+
+
+def extract_employee_ranges(text: str) -> list[str]:
+    """Return every employee-count range found in the text, normalized like '1,001-5,000 employees'."""
+    found = []
+    for pattern in EMPLOYEE_RANGE_PATTERNS:
+        for match in pattern.finditer(text):
+            if match.group("plus"):
+                found.append(f"{_to_int(match.group('plus')):,}+ employees")
+                continue
+            if _is_year_span(match.group("low"), match.group("high")):
+                continue
+            low, high = _to_int(match.group("low")), _to_int(match.group("high"))
+            if 0 < low <= high:
+                found.append(f"{low:,}-{high:,} employees")
+    return list(dict.fromkeys(found))
+
+
+def parse_size_answer(content: str) -> Optional[str]:
+    """Normalize a model's size answer: the first range it names, or a reply that is only a head count."""
+    sizes = extract_employee_ranges(content)
+    if sizes:
+        return sizes[0]
+    match = EMPLOYEE_COUNT_ANSWER_PATTERN.match(content)
+    return f"{_to_int(match.group('count')):,} employees" if match else None
+
 
 class CompanySizeFiller:
-    def __init__(self, model_name: str = "gemini-2.5-flash-preview-05-20", temperature: float = 0.1):
+    def __init__(self, model_name: str | None = None, temperature: float = 0.1,
+                 registry: LLMClientRegistry | None = None, extractor_model_name: str | None = None,
+                 max_concurrency: int = 8):
         load_dotenv()
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=temperature,
-            max_retries=2
-        )
+        self.registry = registry or get_llm_registry()
+        self.model_name = model_name or self.registry.model_for("company_size_filler")
+        # Cheap model used for a single extraction call when the regex heuristics find nothing
+        self.extractor_model_name = extractor_model_name or self.registry.model_for("company_size_extractor")
+        self.temperature = temperature
 
         # Initialize Tavily Search Tool
         self.tavily_search_tool = TavilySearch(
@@ -24,12 +84,92 @@ class CompanySizeFiller:
             topic="general",
         )
 
-        # Create the agent
-        self.agent = create_react_agent(self.llm, [self.tavily_search_tool])
+        # The ReAct agent is the last resort, so it is only built when first needed
+        self._agent = None
+
+        # Which path resolved each company: heuristic, llm_extraction, agent, not_found or timed_out
+        self.stats = Counter()
+
+        # Lookups run concurrently under a stage deadline. Each network call in a lookup has its own
+        # deadline; only the cheap extraction call is hedged, never the whole search/agent chain.
+        self.max_concurrency = max_concurrency
+        deadlines = self.registry.deadlines_for("company_size_filler")
+        self.hedger = Hedger.from_config(deadlines)
+        self.search_timeout = deadlines.get("search_timeout_s", 15)
+        self.agent_timeout = deadlines.get("agent_timeout_s", 120)
+        self.agent_recursion_limit = deadlines.get("agent_recursion_limit", 12)
+        self.stage_timeout = deadlines.get("stage_timeout_s")
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            llm = self.registry.get(self.model_name, temperature=self.temperature, max_retries=2)
+            self._agent = create_react_agent(llm, [self.tavily_search_tool])
+        return self._agent
+
+    async def _search_company(self, company_name: str, industry: Optional[str] = None) -> list[dict]:
+        """Run a single Tavily query for the company and return its result items."""
+        query = f"{company_name} company size number of employees"
+        if isinstance(industry, str) and industry.strip():
+            query = f"{company_name} {industry} company size number of employees"
+        try:
+            response = await asyncio.wait_for(
+                self.tavily_search_tool.ainvoke({"query": query}), timeout=self.search_timeout
+            )
+        except TimeoutError:
+            raise
+        except Exception as e:
+            print(f"[red]Search failed for {company_name}: {e}[/red]")
+            return []
+        if not isinstance(response, dict):
+            return []
+        return response.get("results", [])
+
+    def _size_from_results(self, results: list[dict]) -> Optional[str]:
+        """Pick the employee range most supported by the search snippets, favouring LinkedIn."""
+        votes = Counter()
+        for result in results:
+            url = result.get("url", "")
+            weight = next((w for domain, w in SOURCE_WEIGHTS.items() if domain in url), 1)
+            text = f"{result.get('title', '')}\n{result.get('content', '')}"
+            for size in set(extract_employee_ranges(text)):
+                votes[size] += weight
+        if not votes:
+            return None
+        return votes.most_common(1)[0][0]
 
-    def _fetch_company_size(self, company_name: str, industry: Optional[str] = None) -> Optional[str]:
+    async def _size_from_llm_extraction(self, company_name: str, results: list[dict]) -> Optional[str]:
+        """One cheap model call over the snippets; its answer must still parse as an employee range."""
+        if not results:
+            return None
+        snippets = "\n\n".join(
+            f"Source: {r.get('url', '')}\n{r.get('content', '')}" for r in results
+        )
+        prompt = (
+            f"From the search results below, give the employee count range for the company '{company_name}'.\n"
+            "Answer with the range only, e.g. '51-200 employees'. If it is not stated, answer UNKNOWN.\n\n"
+            f"{snippets}"
+        )
+
+        def make_call():
+            # A hedge takes the next pooled client, so it goes out on a different connection
+            llm = self.registry.get(self.extractor_model_name, temperature=self.temperature, max_retries=2)
+            return llm.ainvoke(prompt)
+
+        try:
+            output = await self.hedger.run(make_call)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            print(f"[red]Extraction call failed for {company_name}: {e}[/red]")
+            return None
+        content = output.content if hasattr(output, "content") else str(output)
+        return parse_size_answer(content)
+
+    async def _fetch_company_size_with_agent(self, company_name: str, industry: Optional[str] = None) -> Optional[str]:
         """
         Uses the agent to fetch the employee size for a company from the web.
+        The run is bounded by a recursion limit (tool-call rounds) and a deadline.
         """
         prompt = f"""
         Search the web and get me the employee count range for the company below.
@@ -48,13 +188,63 @@ class CompanySizeFiller:
 
         try:
             inputs = {"messages": [("user", prompt)]}
-            response = self.agent.invoke(inputs)
-            return response.get("messages", [])[-1].content
+            response = await asyncio.wait_for(
+                self.agent.ainvoke(inputs, config={"recursion_limit": self.agent_recursion_limit}),
+                timeout=self.agent_timeout,
+            )
+            content = response.get("messages", [])[-1].content
+        except TimeoutError:
+            raise
         except Exception as e:
             print(f"[red]Error fetching size for {company_name}: {e}[/red]")
             return None
+        # Store only a normalized range, never the agent's free-text reply
+        return parse_size_answer(str(content))
+
+    async def _fetch_company_size(self, company_name: str, industry: Optional[str] = None) -> Optional[str]:
+        """
+        Fetch the employee range for a company, cheapest path first:
+        one search + regex heuristics, then one extraction call, then the ReAct agent.
+        Raises TimeoutError when one of the calls misses its deadline.
+        """
+        results = await self._search_company(company_name, industry)
+
+        size = self._size_from_results(results)
+        if size:
+            self.stats["heuristic"] += 1
+            return size
+
+        size = await self._size_from_llm_extraction(company_name, results)
+        if size:
+            self.stats["llm_extraction"] += 1
+            return size
+
+        size = await self._fetch_company_size_with_agent(company_name, industry)
+        self.stats["agent" if size else "not_found"] += 1
+        return size
 
-    def fill_missing_sizes(
+    async def _lookup_sizes(self, companies: dict) -> dict:
+        """Look up {company_name: industry} concurrently. Companies that run out of time map to UNCLASSIFIED."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def lookup(company_name, industry):
+            async with semaphore:
+                try:
+                    return await self._fetch_company_size(company_name, industry)
+                except TimeoutError:
+                    self.stats["timed_out"] += 1
+                    print(f"[yellow]Size lookup for {company_name} did not finish in time.[/yellow]")
+                    return UNCLASSIFIED
+
+        tasks = [lookup(company_name, industry) for company_name, industry in companies.items()]
+        sizes = await gather_with_deadline(tasks, self.stage_timeout, UNCLASSIFIED)
+        return dict(zip(companies, sizes))
+
+    def fill_missing_sizes(self, file_path: str, output_path: str, **columns) -> None:
+        """Blocking wrapper around afill_missing_sizes for callers without an event loop."""
+        asyncio.run(self.afill_missing_sizes(file_path, output_path, **columns))
+
+    async def afill_missing_sizes(
             self,
             file_path: str,
             output_path: str,
@@ -63,7 +253,7 @@ class CompanySizeFiller:
             size_col: str = "size",
     ) -> None:
         """
-        Fill missing size values in the CSV file using AI agent and save to /tmp/filled_data.csv.
+        Fill missing size values in the CSV file (search heuristics first, AI agent as fallback) and save to /tmp/filled_data.csv.
 
         Parameters:
             file_path (str): Path to the CSV file.
@@ -78,34 +268,50 @@ class CompanySizeFiller:
         if not Path(file_path).is_file():
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        df = pd.read_csv(file_path)
+        df = read_csv_compact(file_path, stage="company_size_fill")
 
         for col in [company_col, industry_col, size_col]:
             if col not in df.columns:
                 raise ValueError(f"Missing column: '{col}'")
 
-        missing_rows = df[df[size_col].isnull()].copy()
+        # Sizes left Unclassified by an earlier run's deadline are looked up again
+        missing_rows = df[df[size_col].isnull() | (df[size_col] == UNCLASSIFIED)].copy()
 
         # Only process rows that are not Disqualified
         process_rows = missing_rows[missing_rows["label"] != "Disqualified"]
 
         print(f"[bold yellow]Found {len(process_rows)} rows with missing size info.[/bold yellow]")
 
+        # The same company often appears on several job posts; look each one up once
+        companies = {}
         for idx, row in process_rows.iterrows():
             company_name = row[company_col]
-            industry = row[industry_col]
-
             if pd.isnull(company_name) or not str(company_name).strip():
                 print(f"[blue]Skipping row {idx} due to empty company name.[/blue]")
                 continue
+            companies.setdefault(company_name, row[industry_col])
 
-            size = self._fetch_company_size(company_name, industry)
-            if size:
+        sizes_by_company = await self._lookup_sizes(companies) if companies else {}
+
+        for idx, row in process_rows.iterrows():
+            company_name = row[company_col]
+            industry = row[industry_col]
+            if company_name not in sizes_by_company:
+                continue
+            size = sizes_by_company[company_name]
+            if size == UNCLASSIFIED:
+                # Marked so the company classifier leaves the row Unclassified for a retry
+                df.at[idx, size_col] = UNCLASSIFIED
+            elif size:
                 df.at[idx, size_col] = size
                 print(f"[green]Filled size for {company_name} ({industry}): {size}[/green]")
             else:
+                df.at[idx, size_col] = None
                 print(f"[red]Could not find size for {company_name} ({industry})[/red]")
 
+        if self.stats:
+            print(f"[cyan]Company size lookups by path: {dict(self.stats)}; {self.hedger.summary()}[/cyan]")
+
         df.to_csv(output_path, index=False)
         print(f"[bold green]✅ Saved filled dataset to: {output_path}[/bold green]")
 
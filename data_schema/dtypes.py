@@ -0,0 +1,57 @@
+import os
+from typing import get_args
+import pandas as pd
+from rich import print
+from data_schema.schema import JobDescriptionLabel, CompanyDescriptionLabel, UNCLASSIFIED
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    TEXT_DTYPE = pd.StringDtype("python")
+
+# Long or mostly-unique text: one contiguous Arrow buffer instead of a Python object per cell
+TEXT_COLUMNS = ["job_description", "job_title", "salary", "job_url", "company_website", "size", "post_date"]
+
+# Short, highly repetitive values: stored once per distinct value plus small integer codes
+CATEGORY_COLUMNS = ["company_name", "industry", "company_location", "job_type"]
+
+# Label columns only ever hold the schema's literals, or Unclassified
+ENUM_COLUMNS = {
+    "label": pd.CategoricalDtype([*get_args(JobDescriptionLabel), UNCLASSIFIED]),
+    "Is_company_qualified": pd.CategoricalDtype([*get_args(CompanyDescriptionLabel), UNCLASSIFIED]),
+}
+
+COLUMN_DTYPES = {
+    **{col: TEXT_DTYPE for col in TEXT_COLUMNS},
+    **{col: "category" for col in CATEGORY_COLUMNS},
+    **ENUM_COLUMNS,
+}
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the known pipeline columns of an in-memory frame to their compact dtypes."""
+    for col, dtype in COLUMN_DTYPES.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _megabytes(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def read_csv_compact(path: str, stage: str | None = None, **kwargs) -> pd.DataFrame:
+    """
+    pd.read_csv that parses the known pipeline columns straight into compact dtypes.
+
+    With MEMORY_REPORT=1 in the environment, the file is also loaded with default dtypes
+    and the before/after footprint is printed for the given stage.
+    """
+    df = pd.read_csv(path, dtype=COLUMN_DTYPES, **kwargs)
+
+    if stage and os.getenv("MEMORY_REPORT") == "1":
+        before = _megabytes(pd.read_csv(path, **kwargs))
+        after = _megabytes(df)
+        print(f"[magenta]Memory ({stage}) {len(df)} rows: {before:.1f} MB default → {after:.1f} MB compact[/magenta]")
+    return df
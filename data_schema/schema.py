@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Literal
 
 
@@ -6,12 +6,17 @@ from typing import Literal
 JobDescriptionLabel = Literal["SDR Strategy", "AE Strategy", "Disqualified"]
 CompanyDescriptionLabel = Literal["Disqualified", "Qualified"]
 
+# Set by the pipeline (never by a model) for rows that ran out of time; they can be retried later
+UNCLASSIFIED = "Unclassified"
+
 
 class JobQualifier(BaseModel):
     label: JobDescriptionLabel
+    confidence: float = Field(..., ge=0, le=1, description="How confident you are in the label, from 0 (guess) to 1 (certain).")
     # reason: str = Field(..., description="The reason why the particular job description belong to the particular label it was assigned to.")
 
 
 class CompanyQualifier(BaseModel):
     label: CompanyDescriptionLabel
+    confidence: float = Field(..., ge=0, le=1, description="How confident you are in the label, from 0 (guess) to 1 (certain).")
     # reason: str = Field(..., description="The reason why the particular company belong to the particular label it was assigned to based on the instructions provided.")
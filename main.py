@@ -1,17 +1,14 @@
-import pandas as pd
 import os
+import sys
+import shutil
 import asyncio
+import argparse
+import contextlib
 from dotenv import load_dotenv
 from rich import print
 
-# Import your classes
-from utils.data_cleaner import DataPreprocessor
-from utils.salesforce_data_dowloader import SalesforceReportDownloader, remove_existing_companies
-from utils.data_downloader import GoogleDriveDownloader
-from utils.dropbox_uploader import DropboxUploader
-from ai_filters.jd_qualifier import JobClassifier
-from ai_filters.web_search import CompanySizeFiller
-from ai_filters.company_classifier import CompanyClassifier
+# Stage classes are imported lazily, only once the run actually reaches them
+from utils.stage_registry import load_stage
 
 load_dotenv()
 
@@ -20,40 +17,23 @@ report_id = "00OPF000006VAVt2AO"
 password = os.getenv("SF_password")
 security_token = os.getenv("SF_security_token")
 
-# All the orchestration logic should be within a single async function
-async def orchestrate():
-    gdrive_folder_name = "Apify Uploads"
-    config_file = "config/cleaner.yml"
-    cleaned_file_name = "/tmp/cleaned_data.csv"
-    my_dropbox_folder = "/ApifyCleaned"
-    service_account_credentials = "credentials.json"
-    salesforce_file_name = "/tmp/salesforce_report.csv"
-    filtered_data_file_path = "/tmp/filtered_data.csv"
-    jd_classified_path = "/tmp/classified_data.csv"
-    filled_path = "/tmp/filled_data.csv"
-    final_data_path = "/tmp/Completed.csv" # Changed name to avoid conflict
-
-    print("[bold blue]Starting Orchestration Pipeline[/bold blue]")
+gdrive_folder_name = "Apify Uploads"
+config_file = "config/cleaner.yml"
+cleaned_file_name = "/tmp/cleaned_data.csv"
+my_dropbox_folder = "/ApifyCleaned"
+service_account_credentials = "credentials.json"
+salesforce_file_name = "/tmp/salesforce_report.csv"
+filtered_data_file_path = "/tmp/filtered_data.csv"
+final_data_path = "/tmp/Completed.csv" # Changed name to avoid conflict
+shard_dir = "/tmp/shards"
+watch_state_path = "watch_state.json"
+retry_data_path = "/tmp/unclassified.csv"
 
-    # Step 1: Download files from Google Drive (Synchronous)
-    # This part seems to be synchronous, so we'll just call it directly.
-    downloader = GoogleDriveDownloader(
-        folder_name=gdrive_folder_name,
-        service_account_file=service_account_credentials
-    )
-    downloaded_files = downloader.runner()
-    print("Downloaded files:", downloaded_files)
-
-    # Step 2: Preprocess file (Synchronous)
-    preprocessor = DataPreprocessor(config_file, downloaded_files)
-    is_not_empty = preprocessor.runner(output_path=cleaned_file_name)
-
-    if not is_not_empty:
-        print("[yellow]No new files to process. Exiting.[/yellow]")
-        return # Use return instead of else block for cleaner code
 
-    # Step 3: Remove existing companies (Synchronous)
+def download_salesforce_report() -> str:
+    """Step 3a (blocking): log in to Salesforce and download the report of existing companies."""
     print("[cyan]Downloading Salesforce report...[/cyan]")
+    SalesforceReportDownloader = load_stage("salesforce_download")
     downloader = SalesforceReportDownloader(
         username=username,
         password=password,
@@ -62,57 +42,360 @@ async def orchestrate():
     downloader.authenticate()
     report_file_path = downloader.download_report(report_id=report_id, output_path=salesforce_file_name)
     print("File available at:", report_file_path)
+    return report_file_path
+
+
+def start_salesforce_report() -> asyncio.Task:
+    """Start the Salesforce report fetch on a worker thread; await the task for the report path."""
+    return asyncio.create_task(asyncio.to_thread(download_salesforce_report))
+
+
+def discard_task(task: asyncio.Task) -> None:
+    """
+    Drop a background fetch (Salesforce report, Dropbox token refresh) that is no longer needed,
+    e.g. because a later step raised. A fetch already running on its worker thread
+    still finishes there, but nothing waits for it and a failure is not reported as unretrieved.
+    """
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+@contextlib.asynccontextmanager
+async def salesforce_report_per_poll():
+    """Watch mode: one Salesforce report per poll, shared by every file processed in it."""
+    salesforce_report = start_salesforce_report()
+    try:
+        yield salesforce_report
+    finally:
+        discard_task(salesforce_report)
+
+
+async def prepare_filtered_data() -> bool:
+    """
+    Steps 1-3: download today's Drive files, clean them and drop companies already in Salesforce.
+    Returns False when there is nothing new to process.
+
+    Blocking SDK calls run on worker threads. Once Drive reports new files, the Salesforce report
+    is fetched while the files are downloaded and cleaned.
+    """
+    # Step 1: Download files from Google Drive (blocking, on a worker thread)
+    GoogleDriveDownloader = load_stage("drive_download")
+    downloader = await asyncio.to_thread(
+        GoogleDriveDownloader,
+        folder_name=gdrive_folder_name,
+        service_account_file=service_account_credentials
+    )
+    todays_files = await asyncio.to_thread(downloader.list_todays_files)
+
+    if not todays_files:
+        print("[yellow]No new files to process. Exiting.[/yellow]")
+        return False
+
+    # There is work: start the Salesforce fetch now so it overlaps the download and cleaning
+    salesforce_report = start_salesforce_report()
+    downloaded_files = []
+    try:
+        downloaded_files = await asyncio.to_thread(downloader.download_files, todays_files)
+        print("Downloaded files:", downloaded_files)
+        return await clean_and_filter(downloaded_files, salesforce_report)
+    finally:
+        discard_task(salesforce_report)
+        # Each download has its own temporary directory; only the cleaned data is used from here on
+        for path in downloaded_files:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+async def clean_and_filter(downloaded_files: list, salesforce_report: asyncio.Task | None = None) -> bool:
+    """
+    Steps 2-3 for already downloaded files. Returns False when nothing is left.
+    salesforce_report is an already running report fetch owned by the caller; when not given, one is
+    started here so it still overlaps the cleaning, and dropped again if the run stops early.
+    """
+    own_report = salesforce_report is None
+    if own_report:
+        salesforce_report = start_salesforce_report()
+
+    try:
+        # Step 2: Preprocess file (on a worker thread)
+        DataPreprocessor = load_stage("preprocess")
+        preprocessor = DataPreprocessor(config_file, downloaded_files)
+        is_not_empty = await asyncio.to_thread(preprocessor.runner, output_path=cleaned_file_name)
+
+        if not is_not_empty:
+            print("[yellow]No new files to process. Exiting.[/yellow]")
+            return False
+
+        # Step 3: Remove existing companies, once the report has arrived
+        await salesforce_report
+    finally:
+        if own_report:
+            discard_task(salesforce_report)
 
     print("[cyan]Filtering existing companies...[/cyan]")
-    remove_existing_companies(
+    remove_existing_companies = load_stage("remove_existing_companies")
+    await asyncio.to_thread(
+        remove_existing_companies,
         cleaned_file=cleaned_file_name,
         salesforce_file=salesforce_file_name,
         output_file=filtered_data_file_path
     )
+    return True
+
+
+async def classify_and_enrich(input_path: str, output_path: str, work_dir: str = "/tmp") -> None:
+    """
+    Steps 4-6: job classification, company size enrichment and company classification.
+    Intermediate files go to work_dir, so several shards can run side by side.
+    """
+    jd_classified_path = os.path.join(work_dir, "classified_data.csv")
+    filled_path = os.path.join(work_dir, "filled_data.csv")
 
     # Step 4: Job Classification (ASYNC)
     # The dataframe is loaded here.
+    # A missing input is an error, not an empty run: a shard job must not finish without its output
+    from data_schema.dtypes import read_csv_compact
+    if not os.path.isfile(input_path):
+        raise FileNotFoundError(f"Could not find filtered data at {input_path}")
+    df = read_csv_compact(input_path, stage="job_classification")
+
+    if df.empty:
+        print(f"[yellow]No rows in {input_path}, nothing to classify.[/yellow]")
+        df.to_csv(output_path, index=False)
+        return
+
+    # Shared LLM clients for every model stage, closed however the stages end
+    llm_registry = load_stage("llm_registry")()
     try:
-        df = pd.read_csv(filtered_data_file_path)
-    except FileNotFoundError:
-        print(f"[red]Could not find filtered data at {filtered_data_file_path}. Exiting.[/red]")
+        # Open the pooled LLM connections before the first model stage needs them
+        await llm_registry.warm_up()
+
+        print("[cyan]Starting Job Classification...[/cyan]")
+        JobClassifier = load_stage("job_classification")
+        job_classifier = JobClassifier(limit_rows=None) # Increased limit for a more realistic scenario
+        # Await the async method call
+        processed_df = await job_classifier.process_dataframe(df)
+        processed_df.to_csv(jd_classified_path, index=False)
+        print("[green]Job Classification Complete![/green]")
+
+        # Step 5: Company Data Enrichment (ASYNC)
+        print("[cyan]Starting Company Data Enrichment...[/cyan]")
+        CompanySizeFiller = load_stage("company_size_fill")
+        filler = CompanySizeFiller()
+        await filler.afill_missing_sizes(file_path=jd_classified_path, output_path=filled_path)
+        print("[green]Company Data Enrichment Complete![/green]")
+
+        # Step 6: Company Classification (ASYNC)
+        print("[cyan]Starting Company Classification...[/cyan]")
+        CompanyClassifier = load_stage("company_classification")
+        company_classifier = CompanyClassifier(max_concurrency=10)
+        # Await the async method call
+        await company_classifier.process_dataset(
+            input_csv_path=filled_path,
+            output_csv_path=output_path
+        )
+        print("[green]Company Classification Complete![/green]")
+    finally:
+        await llm_registry.aclose()
+
+
+def connect_dropbox() -> asyncio.Task:
+    """Start the Dropbox token refresh on a worker thread; await the task for the ready uploader."""
+    DropboxUploader = load_stage("dropbox_upload")
+    return asyncio.create_task(asyncio.to_thread(DropboxUploader, dropbox_folder=my_dropbox_folder))
+
+
+async def upload_final_data(path: str, uploader_task: asyncio.Task | None = None) -> None:
+    """
+    Step 7: upload the qualified rows that are new or changed since the last run, plus a manifest,
+    to Dropbox, reusing an uploader authenticated in advance.
+    """
+    uploader = await (uploader_task or connect_dropbox())
+    print("[cyan]Uploading the day's delta to Dropbox...[/cyan]")
+    DeltaExporter = load_stage("delta_export")
+    link = await asyncio.to_thread(DeltaExporter().export, path, uploader)
+    print(f"[bold green]Final pipeline complete! Manifest available at: {link}[/bold green]")
+
+
+# All the orchestration logic should be within a single async function
+async def orchestrate():
+    print("[bold blue]Starting Orchestration Pipeline[/bold blue]")
+
+    if not await prepare_filtered_data():
+        return # Use return instead of else block for cleaner code
+
+    # Refresh the Dropbox token while the classifiers run
+    dropbox_uploader = connect_dropbox()
+    try:
+        await classify_and_enrich(filtered_data_file_path, final_data_path)
+        await upload_final_data(final_data_path, dropbox_uploader)
+    finally:
+        discard_task(dropbox_uploader)
+
+
+async def retry_unclassified(path: str | None = None) -> None:
+    """
+    Steps 4-7 again for rows left Unclassified by a stage deadline; everything already decided is kept.
+    By default the rows come from the list the delta export keeps in Dropbox, so the retry can run on
+    any machine (e.g. the next day's CI job). Rows that are settled drop off that list.
+    """
+    dropbox_uploader = connect_dropbox()
+    try:
+        if path is None:
+            uploader = await dropbox_uploader
+            path = retry_data_path
+            DeltaExporter = load_stage("delta_export")
+            if not await asyncio.to_thread(DeltaExporter().download_unclassified, uploader, path):
+                print("[yellow]No unclassified rows waiting for a retry.[/yellow]")
+                return
+
+        print(f"[bold blue]Retrying unclassified rows in {path}[/bold blue]")
+        output_path = "/tmp/Completed_retry.csv"
+        await classify_and_enrich(path, output_path)
+        await upload_final_data(output_path, dropbox_uploader)
+    finally:
+        discard_task(dropbox_uploader)
+
+
+# --- Watch mode ---------------------------------------------------------------------------------
+# A long-running service that pushes each Drive upload through the pipeline as it lands.
+
+async def process_new_file(local_path: str, file_name: str, salesforce_report: asyncio.Task | None = None) -> None:
+    """
+    Steps 2-7 for a single uploaded file. Each file gets its own Completed_<name>.csv upload.
+    salesforce_report is the poll's shared report fetch (see salesforce_report_per_poll).
+    """
+    if not await clean_and_filter([local_path], salesforce_report):
         return
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    output_path = f"/tmp/Completed_{stem}.csv"
+    dropbox_uploader = connect_dropbox()
+    try:
+        await classify_and_enrich(filtered_data_file_path, output_path)
+        await upload_final_data(output_path, dropbox_uploader)
+    finally:
+        discard_task(dropbox_uploader)
 
-    print("[cyan]Starting Job Classification...[/cyan]")
-    job_classifier = JobClassifier(limit_rows=None) # Increased limit for a more realistic scenario
-    # Await the async method call
-    processed_df = await job_classifier.process_dataframe(df)
-    processed_df.to_csv(jd_classified_path, index=False)
-    print("[green]Job Classification Complete![/green]")
-
-    # Step 5: Company Data Enrichment (Synchronous)
-    # This seems to be a synchronous process, so no await is needed.
-    print("[cyan]Starting Company Data Enrichment...[/cyan]")
-    filler = CompanySizeFiller()
-    filler.fill_missing_sizes(file_path=jd_classified_path, output_path=filled_path)
-    print("[green]Company Data Enrichment Complete![/green]")
-
-    # Step 6: Company Classification (ASYNC)
-    print("[cyan]Starting Company Classification...[/cyan]")
-    company_classifier = CompanyClassifier(max_concurrency=10)
-    # Await the async method call
-    await company_classifier.process_dataset(
-        input_csv_path=filled_path,
-        output_csv_path=final_data_path
+
+async def watch(poll_interval: float, local_folder: str | None = None, once: bool = False, max_attempts: int = 5) -> None:
+    drive_watcher = load_stage("drive_watcher")
+    if local_folder:
+        source = drive_watcher.LocalFolderSource(local_folder)
+    else:
+        GoogleDriveDownloader = load_stage("drive_download")
+        source = GoogleDriveDownloader(
+            folder_name=gdrive_folder_name,
+            service_account_file=service_account_credentials
+        )
+    watcher = drive_watcher.DriveWatcher(
+        source,
+        process_new_file,
+        state_path=watch_state_path,
+        poll_interval=poll_interval,
+        poll_context=salesforce_report_per_poll,
+        max_attempts=max_attempts,
     )
-    print("[green]Company Classification Complete![/green]")
+    if once:
+        await watcher.poll_once()
+    else:
+        await watcher.run_forever()
+
+
+# --- Sharded execution -------------------------------------------------------------------------
+# The filtered dataset is split by a stable hash of company name; steps 4-6 run once per shard,
+# either as local worker processes (--workers) or as separate CI jobs (prepare / shard / merge).
+
+def prepare_shards(n_shards: int) -> list[str]:
+    """Steps 1-3, then split the filtered data into n_shards files. Returns [] when there is no work."""
+    if not asyncio.run(prepare_filtered_data()):
+        return []
+    sharding = load_stage("sharding")
+    return sharding.split_into_shards(filtered_data_file_path, n_shards, shard_dir)
+
+
+def run_shard(index: int) -> str:
+    """Steps 4-6 for one shard, in its own event loop. Also the entry point of each worker process."""
+    sharding = load_stage("sharding")
+    work_dir = os.path.join(shard_dir, f"work_{index}")
+    os.makedirs(work_dir, exist_ok=True)
+    output_path = sharding.completed_shard_path(shard_dir, index)
+    asyncio.run(classify_and_enrich(sharding.shard_path(shard_dir, index), output_path, work_dir=work_dir))
+    return output_path
+
+
+def merge_and_upload(n_shards: int) -> None:
+    """Merge every shard output back into the original row order, then upload."""
+    sharding = load_stage("sharding")
+    paths = [sharding.completed_shard_path(shard_dir, index) for index in range(n_shards)]
+    sharding.merge_shards(paths, final_data_path)
+    asyncio.run(upload_final_data(final_data_path))
+
+
+def orchestrate_sharded(n_workers: int) -> None:
+    """Run the whole pipeline locally with one worker process per shard."""
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    print(f"[bold blue]Starting Sharded Orchestration Pipeline ({n_workers} workers)[/bold blue]")
+    if not prepare_shards(n_workers):
+        return
+
+    # "spawn" so no worker inherits gRPC channels or event loops from this process
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=get_context("spawn")) as pool:
+        outputs = list(pool.map(run_shard, range(n_workers)))
+    print(f"[green]All {len(outputs)} shards complete.[/green]")
+
+    merge_and_upload(n_workers)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Job leads pipeline")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Run locally with this many shard worker processes (default: single process).")
+    commands = parser.add_subparsers(dest="command")
+
+    prepare = commands.add_parser("prepare", help="Steps 1-3 and split the filtered data into shards.")
+    prepare.add_argument("--shards", type=int, required=True)
+
+    shard = commands.add_parser("shard", help="Steps 4-6 for a single shard.")
+    shard.add_argument("--index", type=int, required=True)
+
+    merge = commands.add_parser("merge", help="Merge shard outputs and upload to Dropbox.")
+    merge.add_argument("--shards", type=int, required=True)
+
+    watch_ = commands.add_parser("watch", help="Process Drive uploads continuously as they arrive.")
+    watch_.add_argument("--interval", type=float, default=300, help="Seconds between polls.")
+    watch_.add_argument("--local-folder", help="Watch a local folder instead of Google Drive.")
+    watch_.add_argument("--once", action="store_true", help="Poll a single time and exit.")
+    watch_.add_argument("--max-attempts", type=int, default=5,
+                        help="Give up on a file after this many failed attempts (retries back off exponentially).")
 
-    # Step 7: Upload to Dropbox (Synchronous)
-    print("[cyan]Uploading final data to Dropbox...[/cyan]")
-    uploader = DropboxUploader(dropbox_folder=my_dropbox_folder)
-    link = uploader.upload(final_data_path)
-    print(f"[bold green]Final pipeline complete! File available at: {link}[/bold green]")
+    retry = commands.add_parser("retry", help="Re-run steps 4-7 for rows left Unclassified by a stage deadline.")
+    retry.add_argument("--input", help="A finished dataset to retry instead of the unclassified rows kept in Dropbox.")
+    return parser.parse_args()
 
 
 # The single entry point to the async world
 if __name__ == '__main__':
+    args = parse_args()
     # Use asyncio.run() once to start the event loop
     try:
-        asyncio.run(orchestrate())
+        if args.command == "prepare":
+            prepare_shards(args.shards)
+        elif args.command == "shard":
+            run_shard(args.index)
+        elif args.command == "merge":
+            merge_and_upload(args.shards)
+        elif args.command == "watch":
+            asyncio.run(watch(args.interval, args.local_folder, args.once, args.max_attempts))
+        elif args.command == "retry":
+            asyncio.run(retry_unclassified(args.input))
+        elif args.workers > 1:
+            orchestrate_sharded(args.workers)
+        else:
+            asyncio.run(orchestrate())
     except Exception as e:
-        print(f"[bold red]An error occurred during orchestration:[/bold red] {e}")
\ No newline at end of file
+        print(f"[bold red]An error occurred during orchestration:[/bold red] {e}")
+        # Non-zero, so a failed CI step (prepare, shard, merge, retry, the daily run) shows as failed
+        sys.exit(1)
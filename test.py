@@ -1,7 +1,7 @@
 import asyncio
 import time
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+from ai_filters.llm_clients import get_llm_registry
 
 load_dotenv()
 
@@ -11,7 +11,7 @@ semaphore = asyncio.Semaphore(5)
 async def send_request(prompt):
     async with semaphore:
         print(f"Starting request for: {prompt}")
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+        llm = get_llm_registry().get("gemini-2.5-flash")
         response = await llm.ainvoke(prompt)
         print(f"Finished request for: {prompt}")
         return response
@@ -19,7 +19,10 @@ async def send_request(prompt):
 
 async def main(prompts):
     tasks = [send_request(prompt) for prompt in prompts]
-    results = await asyncio.gather(*tasks)
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        await get_llm_registry().aclose()
     return results
 
 
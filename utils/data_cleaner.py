@@ -2,6 +2,7 @@ import pandas as pd
 from rich import print
 import yaml
 from typing import Literal
+from data_schema.dtypes import compact_dtypes
 
 
 class DataPreprocessor:
@@ -79,7 +80,7 @@ class DataPreprocessor:
             except Exception as e:
                 print(f"Unknown error occurred while processing : {url}")
         # Merging the columns into 1
-        concatenated_df = pd.concat(datasets, ignore_index=True)
+        concatenated_df = compact_dtypes(pd.concat(datasets, ignore_index=True))
 
         # Removing duplicated rows.
         before = len(concatenated_df)
@@ -1,5 +1,6 @@
 import os
 import io
+import shutil
 import tempfile
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
@@ -55,35 +56,85 @@ class GoogleDriveDownloader:
         ]
 
     def _download_file_to_temp(self, file_id, file_name):
-        """Download a Drive file to a temporary file and return its local path."""
+        """
+        Download a Drive file into its own temporary directory and return its local path.
+        The caller removes that directory (the path's parent) once the file is processed.
+        """
         temp_dir = tempfile.mkdtemp()
         local_path = os.path.join(temp_dir, file_name)
 
-        request = self.service.files().get_media(fileId=file_id)
-        with io.FileIO(local_path, 'wb') as fh:
-            download = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = download.next_chunk()
-                if status:
-                    print(f"⬇️  Downloading {file_name}... {int(status.progress() * 100)}%")
+        try:
+            request = self.service.files().get_media(fileId=file_id)
+            with io.FileIO(local_path, 'wb') as fh:
+                download = MediaIoBaseDownload(fh, request)
+                done = False
+                while not done:
+                    status, done = download.next_chunk()
+                    if status:
+                        print(f"⬇️  Downloading {file_name}... {int(status.progress() * 100)}%")
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
 
         print(f"✅ Downloaded to temp: {local_path}")
         return local_path
 
-    def runner(self) -> list:
-        """Execute the process: authenticate, list today's files, and download them."""
+    def list_todays_files(self) -> list:
+        """List the files created today in the folder, without downloading them."""
         folder_id = self._get_folder_id_by_name()
         files = self._list_files_in_folder(folder_id)
-        todays_files = self._filter_files_created_today(files)
+        return self._filter_files_created_today(files)
+
+    def download_files(self, files) -> list:
+        """Download the given files and return their local paths."""
+        downloaded_files = []
+        for f in files:
+            local_path = self._download_file_to_temp(f['id'], f['name'])
+            downloaded_files.append(local_path)
+
+        return downloaded_files
+
+    def runner(self) -> list:
+        """Execute the process: authenticate, list today's files, and download them."""
+        todays_files = self.list_todays_files()
 
         if not todays_files:
             print("⚠️ No files created today.")
             return []
 
-        downloaded_files = []
-        for f in todays_files:
-            local_path = self._download_file_to_temp(f['id'], f['name'])
-            downloaded_files.append(local_path)
+        return self.download_files(todays_files)
 
-        return downloaded_files
\ No newline at end of file
+    # --- Incremental access for watch mode (see utils/drive_watcher.py) ---
+
+    def start_token(self) -> str:
+        """Drive change-feed token for 'now'; changes after this point are returned by list_changes."""
+        return self.service.changes().getStartPageToken().execute()["startPageToken"]
+
+    def initial_files(self) -> list:
+        """Files to pick up when watching starts without a saved token: today's uploads."""
+        return self.list_todays_files()
+
+    def list_changes(self, page_token: str) -> tuple[list, str]:
+        """Return files added to the folder since page_token, and the token to resume from next time."""
+        folder_id = self._get_folder_id_by_name()
+        files = []
+        while True:
+            response = self.service.changes().list(
+                pageToken=page_token,
+                spaces="drive",
+                fields="nextPageToken, newStartPageToken, "
+                       "changes(removed, file(id, name, parents, mimeType, createdTime, trashed))",
+            ).execute()
+            for change in response.get("changes", []):
+                f = change.get("file")
+                if change.get("removed") or not f or f.get("trashed"):
+                    continue
+                if folder_id in f.get("parents", []):
+                    files.append(f)
+            if "newStartPageToken" in response:
+                return files, response["newStartPageToken"]
+            page_token = response["nextPageToken"]
+
+    def download(self, f) -> str:
+        """Download one file returned by initial_files/list_changes and return its local path."""
+        return self._download_file_to_temp(f['id'], f['name'])
@@ -0,0 +1,221 @@
+import os
+import json
+import yaml
+import pandas as pd
+from datetime import datetime, timezone, timedelta
+from rich import print
+from data_schema.dtypes import read_csv_compact
+from data_schema.schema import UNCLASSIFIED
+
+LABEL_COLUMNS = ["label", "Is_company_qualified"]
+
+
+def _hash_columns(df: pd.DataFrame, columns: list) -> pd.Series:
+    """Stable 64-bit hash per row of the given columns, as hex strings (independent of column dtypes)."""
+    values = df[columns].astype("string").fillna("").astype(object)
+    return pd.util.hash_pandas_object(values, index=False).map("{:016x}".format)
+
+
+class DeltaExporter:
+    """
+    Exports only the qualified rows that are new or changed since the previous run.
+
+    The previous run is described by a state file of row fingerprints and labels, kept in the
+    Dropbox folder next to the exports. Each run writes the delta CSV(s) plus a small manifest
+    describing them, then uploads the updated state last, so a failed run is simply exported again.
+    """
+
+    def __init__(self, config_path: str = "config/delta_export.yml"):
+        with open(config_path, "r") as file:
+            config = yaml.safe_load(file)
+
+        self.identity_columns = config["identity_columns"]
+        self.fallback_identity_columns = config.get("fallback_identity_columns", [])
+        self.qualified = config["qualified"]
+        self.partition_by = config.get("partition_by") or []
+        self.sources = config.get("sources", {})
+        self.state_file = config.get("state_file", "export_state.json")
+        self.unclassified_file = config.get("unclassified_file", "unclassified.csv")
+        self.retention_days = config.get("retention_days", 90)
+
+        unknown = set(self.partition_by) - {"label", "source"}
+        if unknown:
+            raise ValueError(f"Unsupported partition keys: {sorted(unknown)}")
+
+    def _identities(self, df: pd.DataFrame) -> pd.Series:
+        primary = [col for col in self.identity_columns if col in df.columns]
+        fallback = [col for col in self.fallback_identity_columns if col in df.columns]
+        if not primary and not fallback:
+            raise ValueError("None of the configured identity columns are in the dataset.")
+
+        identities = _hash_columns(df, primary) if primary else pd.Series(pd.NA, index=df.index, dtype="object")
+        if fallback:
+            missing = df[primary].isna().all(axis=1) if primary else pd.Series(True, index=df.index)
+            identities = identities.mask(missing, _hash_columns(df, fallback))
+        return identities
+
+    def _is_qualified(self, df: pd.DataFrame) -> pd.Series:
+        qualified = pd.Series(True, index=df.index)
+        for col, allowed in self.qualified.items():
+            qualified &= df[col].isin(allowed) if col in df.columns else False
+        return qualified
+
+    def _sources(self, df: pd.DataFrame) -> pd.Series:
+        urls = df["job_url"].astype("string").fillna("").str.lower() if "job_url" in df.columns else pd.Series("", index=df.index)
+        sources = pd.Series("other", index=df.index, dtype="object")
+        for name, domain in self.sources.items():
+            sources[urls.str.contains(domain, regex=False)] = name
+        return sources
+
+    def _could_qualify(self, df: pd.DataFrame) -> pd.Series:
+        """Rows whose settled labels are all allowed, i.e. that a retry of the Unclassified ones could export."""
+        could_qualify = pd.Series(True, index=df.index)
+        for col, allowed in self.qualified.items():
+            if col in df.columns:
+                values = df[col].astype(object)
+                could_qualify &= values.isin([*allowed, UNCLASSIFIED]) | values.isna()
+        return could_qualify
+
+    def _update_unclassified(self, df: pd.DataFrame, uploader, path: str) -> int:
+        """
+        Write the rows waiting for a retry to path: earlier runs' Unclassified rows this run did not
+        see again, plus this run's that could still be exported. Returns how many are waiting.
+        """
+        labels = df[[col for col in LABEL_COLUMNS if col in df.columns]].astype(object)
+        unclassified = df[labels.eq(UNCLASSIFIED).any(axis=1) & self._could_qualify(df)]
+
+        if uploader.download(self.unclassified_file, path):
+            previous = read_csv_compact(path)
+            if not previous.empty:
+                previous = previous[~self._identities(previous).isin(set(self._identities(df)))]
+            pending = pd.concat([previous.astype(object), unclassified.astype(object)], ignore_index=True)
+        else:
+            pending = unclassified
+        pending.to_csv(path, index=False)
+        return len(pending)
+
+    def download_unclassified(self, uploader, path: str) -> bool:
+        """Download the rows waiting for a retry. Returns False when there are none."""
+        if not uploader.download(self.unclassified_file, path):
+            return False
+        return not read_csv_compact(path).empty
+
+    def build(self, df: pd.DataFrame, state: dict, run_name: str, work_dir: str) -> tuple[list, dict, dict]:
+        """
+        Diff the final dataset against the previous state.
+        Returns (written delta file paths, manifest, new state).
+        """
+        now = datetime.now(timezone.utc)
+        identities = self._identities(df)
+        fingerprints = _hash_columns(df, list(df.columns))
+        qualified = self._is_qualified(df)
+
+        previous = identities.map(lambda identity: state.get(identity, {}).get("fingerprint"))
+        is_new = previous.isna()
+        is_changed = ~is_new & (previous != fingerprints)
+        delta = df[qualified & (is_new | is_changed)]
+
+        # Previously exported rows that come back no longer qualified, so consumers can drop them
+        was_qualified = identities.map(lambda identity: state.get(identity, {}).get("qualified", False)).astype(bool)
+        key_columns = [col for col in self.identity_columns + self.fallback_identity_columns if col in df.columns]
+        dequalified = (
+            df.loc[was_qualified & ~qualified, key_columns].astype(object).where(lambda frame: frame.notna(), None)
+            .to_dict(orient="records")
+        )
+
+        os.makedirs(work_dir, exist_ok=True)
+        files = []
+        if not delta.empty:
+            if self.partition_by:
+                keys = pd.DataFrame(index=delta.index)
+                if "label" in self.partition_by:
+                    keys["label"] = delta["label"].astype(str)
+                if "source" in self.partition_by:
+                    keys["source"] = self._sources(delta)
+                groups = delta.groupby([keys[key] for key in self.partition_by], observed=True, sort=True)
+            else:
+                groups = [((), delta)]
+
+            for values, part in groups:
+                values = values if isinstance(values, tuple) else (values,)
+                suffix = "".join(f"_{str(value).replace(' ', '_')}" for value in values)
+                path = os.path.join(work_dir, f"{run_name}_delta{suffix}.csv")
+                part.to_csv(path, index=False)
+                files.append({"path": path, "rows": len(part), "partition": dict(zip(self.partition_by, map(str, values)))})
+
+        # Every row seen today refreshes its state entry, qualified or not
+        new_state = dict(state)
+        seen = now.date().isoformat()
+        labels = df.reindex(columns=LABEL_COLUMNS).astype(object).where(lambda frame: frame.notna(), None)
+        for identity, fingerprint, is_qualified, row_labels in zip(
+                identities, fingerprints, qualified, labels.itertuples(index=False, name=None)
+        ):
+            new_state[identity] = {
+                "fingerprint": fingerprint,
+                "qualified": bool(is_qualified),
+                "labels": dict(zip(LABEL_COLUMNS, row_labels)),
+                "last_seen": seen,
+            }
+        cutoff = (now - timedelta(days=self.retention_days)).date().isoformat()
+        new_state = {identity: entry for identity, entry in new_state.items() if entry["last_seen"] >= cutoff}
+
+        manifest = {
+            "run": run_name,
+            "created_at": now.isoformat(),
+            "input_rows": len(df),
+            "qualified_rows": int(qualified.sum()),
+            "new_rows": int((qualified & is_new).sum()),
+            "changed_rows": int((qualified & is_changed).sum()),
+            "unchanged_rows": int((qualified & ~is_new & ~is_changed).sum()),
+            "dequalified": dequalified,
+            "partition_by": self.partition_by,
+            "files": [{"name": os.path.basename(f["path"]), "rows": f["rows"], "partition": f["partition"]} for f in files],
+            "state_rows": len(new_state),
+        }
+        return [f["path"] for f in files], manifest, new_state
+
+    def export(self, final_csv: str, uploader, run_name: str | None = None, work_dir: str = "/tmp/delta") -> str | None:
+        """
+        Upload the delta of final_csv and its manifest with the given DropboxUploader.
+        Returns the manifest's share link.
+
+        Every run gets its own file names (a UTC timestamp is appended to run_name), and existing
+        files are never overwritten, so a second run on the same day cannot replace a delta that
+        consumers have not fetched yet.
+        """
+        run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        run_name = f"{run_name or os.path.splitext(os.path.basename(final_csv))[0]}_{run_id}"
+        os.makedirs(work_dir, exist_ok=True)
+
+        state_path = os.path.join(work_dir, self.state_file)
+        state = {}
+        if uploader.download(self.state_file, state_path):
+            with open(state_path, "r") as file:
+                state = json.load(file)
+        else:
+            print("⚠️ No previous export state found, every qualified row counts as new.")
+
+        df = read_csv_compact(final_csv, stage="delta_export")
+        files, manifest, new_state = self.build(df, state, run_name, work_dir)
+        unclassified_path = os.path.join(work_dir, self.unclassified_file)
+        manifest["unclassified_waiting"] = self._update_unclassified(df, uploader, unclassified_path)
+        print(
+            f"📦 Delta: {manifest['new_rows']} new, {manifest['changed_rows']} changed, "
+            f"{len(manifest['dequalified'])} dequalified of {manifest['input_rows']} rows; "
+            f"{manifest['unclassified_waiting']} unclassified rows waiting for a retry."
+        )
+
+        for path in files:
+            uploader.upload_as(path, os.path.basename(path), overwrite=False)
+
+        manifest_path = os.path.join(work_dir, f"{run_name}_manifest.json")
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file, indent=2)
+        link = uploader.upload_as(manifest_path, os.path.basename(manifest_path), overwrite=False, share=True)
+        uploader.upload_as(unclassified_path, self.unclassified_file)
+
+        # The state goes last: if anything above failed, the next run exports these rows again
+        with open(state_path, "w") as file:
+            json.dump(new_state, file)
+        uploader.upload_as(state_path, self.state_file)
+        return link
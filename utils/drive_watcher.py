@@ -0,0 +1,219 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+import contextlib
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncContextManager, Awaitable, Callable
+from rich import print
+
+
+class LocalFolderSource:
+    """
+    Local stand-in for the "Apify Uploads" Drive folder, with the same interface as
+    GoogleDriveDownloader's watch methods. The change token is the newest modification time seen.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+
+    def _files(self, since: float = 0.0) -> list:
+        files = []
+        for name in sorted(os.listdir(self.folder)):
+            path = os.path.join(self.folder, name)
+            # ">=" so files sharing the token's mtime are not missed; the ledger drops repeats
+            if os.path.isfile(path) and os.path.getmtime(path) >= since:
+                files.append({"id": path, "name": name, "mtime": os.path.getmtime(path)})
+        return files
+
+    def start_token(self) -> str:
+        return str(max((f["mtime"] for f in self._files()), default=0.0))
+
+    def initial_files(self) -> list:
+        today = datetime.now(timezone.utc).date()
+        return [f for f in self._files() if datetime.fromtimestamp(f["mtime"], timezone.utc).date() == today]
+
+    def list_changes(self, page_token: str) -> tuple[list, str]:
+        files = self._files(since=float(page_token))
+        new_token = max((f["mtime"] for f in files), default=float(page_token))
+        return files, str(new_token)
+
+    def download(self, f) -> str:
+        # Copy, like a Drive download, so the pipeline never touches the watched folder. The copy gets
+        # its own temporary directory, which the watcher removes once the file is processed.
+        temp_dir = tempfile.mkdtemp()
+        local_path = os.path.join(temp_dir, f["name"])
+        try:
+            shutil.copy(f["id"], local_path)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        return local_path
+
+
+class WatchState:
+    """
+    Persisted watch progress: the change token, files seen but not yet processed (pending, with
+    their failed attempts and when they may be retried), and ledgers of processed files and of files
+    that kept failing. Saved after every change so a restart resumes where it stopped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.page_token = None
+        self.pending = {}
+        self.processed = {}
+        self.failed = {}
+        if os.path.isfile(path):
+            with open(path, "r") as file:
+                data = json.load(file)
+            self.page_token = data.get("page_token")
+            self.pending = data.get("pending", {})
+            self.processed = data.get("processed", {})
+            self.failed = data.get("failed", {})
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(
+                {
+                    "page_token": self.page_token,
+                    "pending": self.pending,
+                    "processed": self.processed,
+                    "failed": self.failed,
+                },
+                file,
+                indent=2,
+            )
+        os.replace(temp_path, self.path)
+
+    def enqueue(self, files: list) -> int:
+        added = 0
+        for f in files:
+            if f["id"] not in self.processed and f["id"] not in self.pending and f["id"] not in self.failed:
+                self.pending[f["id"]] = {"id": f["id"], "name": f["name"], "attempts": 0}
+                added += 1
+        return added
+
+    def due(self) -> list:
+        """Pending files whose retry time (if any) has come."""
+        now = datetime.now(timezone.utc)
+        return [
+            f for f in self.pending.values()
+            if not f.get("retry_at") or datetime.fromisoformat(f["retry_at"]) <= now
+        ]
+
+    def mark_processed(self, file_id: str) -> None:
+        f = self.pending.pop(file_id)
+        self.processed[file_id] = {"name": f["name"], "processed_at": datetime.now(timezone.utc).isoformat()}
+
+    def mark_attempt_failed(self, file_id: str, error: str, max_attempts: int, backoff_s: float) -> bool:
+        """
+        Record a failed attempt. The wait before the next one doubles each time; after max_attempts
+        the file moves to the failed ledger. Returns True when the file was given up on.
+        """
+        f = self.pending[file_id]
+        f["attempts"] = f.get("attempts", 0) + 1
+        f["last_error"] = error
+        now = datetime.now(timezone.utc)
+        if f["attempts"] >= max_attempts:
+            del self.pending[file_id]
+            self.failed[file_id] = {
+                "name": f["name"], "attempts": f["attempts"], "last_error": error, "failed_at": now.isoformat()
+            }
+            return True
+        f["retry_at"] = (now + timedelta(seconds=backoff_s * 2 ** (f["attempts"] - 1))).isoformat()
+        return False
+
+
+class DriveWatcher:
+    """
+    Long-running service: polls a source for new uploads and pushes each file through the pipeline
+    as it lands, instead of one daily batch. A file that fails stays pending and is retried with
+    exponential backoff (retry_backoff_s, doubling per attempt); after max_attempts it is moved to the
+    state's failed ledger and left alone, so a broken file cannot re-run every stage on every poll.
+
+    poll_context, when given, is entered once per poll that has files to process; what it yields is
+    passed to process_file as a third argument, so every file of a poll can share one lookup.
+    Source calls are blocking and run on a worker thread.
+    """
+
+    def __init__(
+            self,
+            source,
+            process_file: Callable[..., Awaitable[None]],
+            state_path: str = "watch_state.json",
+            poll_interval: float = 300,
+            poll_context: Callable[[], AsyncContextManager[Any]] | None = None,
+            max_attempts: int = 5,
+            retry_backoff_s: float | None = None,
+    ):
+        self.source = source
+        self.process_file = process_file
+        self.state = WatchState(state_path)
+        self.poll_interval = poll_interval
+        self.poll_context = poll_context
+        self.max_attempts = max_attempts
+        self.retry_backoff = poll_interval if retry_backoff_s is None else retry_backoff_s
+
+    def _collect_new_files(self) -> None:
+        if self.state.page_token is None:
+            # First start: take the current token, and today's files so nothing uploaded earlier is missed
+            self.state.page_token = self.source.start_token()
+            files = self.source.initial_files()
+        else:
+            files, self.state.page_token = self.source.list_changes(self.state.page_token)
+
+        added = self.state.enqueue(files)
+        self.state.save()
+        if added:
+            print(f"📥 {added} new file(s) queued for processing.")
+
+    async def poll_once(self) -> int:
+        """Pick up new files and process every pending one that is due. Returns how many were processed."""
+        await asyncio.to_thread(self._collect_new_files)
+        due = self.state.due()
+        if not due:
+            return 0
+
+        processed = 0
+        async with self.poll_context() if self.poll_context else contextlib.nullcontext() as shared:
+            for f in due:
+                file_id = f["id"]
+                print(f"[cyan]Processing {f['name']}...[/cyan]")
+                local_path = None
+                try:
+                    local_path = await asyncio.to_thread(self.source.download, f)
+                    if self.poll_context:
+                        await self.process_file(local_path, f["name"], shared)
+                    else:
+                        await self.process_file(local_path, f["name"])
+                except Exception as e:
+                    gave_up = self.state.mark_attempt_failed(file_id, str(e), self.max_attempts, self.retry_backoff)
+                    self.state.save()
+                    if gave_up:
+                        print(f"[red]Failed to process {f['name']} {self.max_attempts} times, giving up:[/red] {e}")
+                    else:
+                        print(f"[red]Failed to process {f['name']}, will retry at {f['retry_at']}:[/red] {e}")
+                    continue
+                finally:
+                    # Downloads land in their own temporary directory; a retry downloads the file again
+                    if local_path:
+                        shutil.rmtree(os.path.dirname(local_path), ignore_errors=True)
+                self.state.mark_processed(file_id)
+                self.state.save()
+                processed += 1
+        return processed
+
+    async def run_forever(self) -> None:
+        print(f"[bold blue]Watching for new uploads every {self.poll_interval:.0f}s[/bold blue]")
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print(f"[red]Poll failed:[/red] {e}")
+            await asyncio.sleep(self.poll_interval)
@@ -43,12 +43,34 @@ class DropboxUploader:
         dropbox_filename = f"{base}_{today}{ext}"
         return f"{self.dropbox_folder}/{dropbox_filename}"
 
-    def _upload_file(self, local_file_path, dropbox_path):
-        """Upload the file to Dropbox."""
+    def _upload_file(self, local_file_path, dropbox_path, overwrite=True):
+        """Upload the file to Dropbox. With overwrite=False an existing file makes the upload fail."""
+        mode = dropbox.files.WriteMode.overwrite if overwrite else dropbox.files.WriteMode.add
         with open(local_file_path, "rb") as f:
-            self.dbx.files_upload(f.read(), dropbox_path, mode=dropbox.files.WriteMode.overwrite)
+            self.dbx.files_upload(f.read(), dropbox_path, mode=mode, autorename=False)
         print(f"✅ Uploaded to Dropbox: {dropbox_path}")
 
+    def upload_as(self, local_file_path, dropbox_name, overwrite=True, share=False):
+        """
+        Upload a file under a fixed name in the folder (no date suffix).
+        Returns the shareable link when share=True, otherwise the Dropbox path.
+        """
+        dropbox_path = f"{self.dropbox_folder}/{dropbox_name}"
+        self._upload_file(local_file_path, dropbox_path, overwrite=overwrite)
+        return self._get_shareable_link(dropbox_path) if share else dropbox_path
+
+    def download(self, dropbox_name, local_file_path):
+        """Download a file from the folder. Returns False if it does not exist."""
+        dropbox_path = f"{self.dropbox_folder}/{dropbox_name}"
+        try:
+            self.dbx.files_download_to_file(local_file_path, dropbox_path)
+        except dropbox.exceptions.ApiError as e:
+            if e.error.is_path() and e.error.get_path().is_not_found():
+                return False
+            raise
+        print(f"✅ Downloaded from Dropbox: {dropbox_path}")
+        return True
+
     def _get_shareable_link(self, dropbox_path):
         """Generate or retrieve a shareable download link."""
         try:
@@ -0,0 +1,147 @@
+"""
+Check that the classifier prompts keep a byte-stable, cacheable static prefix.
+
+Builds each classifier twice against a local fake provider (no network, no API key), classifies a few
+sample rows and fails when the static prefix differs between instances or a prompt does not start with
+it. The fake provider reports cached input tokens the way Gemini's implicit prefix cache does, so the
+cached vs. uncached token tracking is exercised too.
+
+Usage: python -m utils.prompt_prefix_check
+"""
+import asyncio
+import hashlib
+import json
+import sys
+from collections import defaultdict
+
+import pandas as pd
+from langchain_core.messages import AIMessage
+
+from ai_filters.company_classifier import CompanyClassifier
+from ai_filters.jd_qualifier import JobClassifier
+from ai_filters.llm_clients import LLMClientRegistry
+from ai_filters.prompt_cache import MIN_CACHEABLE_TOKENS, estimate_tokens
+
+SAMPLE_JOBS = pd.DataFrame({
+    "job_title": ["Sales Development Representative", "Account Executive", "Warehouse Associate"],
+    "job_description": ["Prospect and book meetings.", "Own the full sales cycle.", "Pick and pack orders."],
+    "job_type": ["Full-time"] * 3,
+    "salary": ["$60,000", "$90,000", "$18/hr"],
+})
+
+SAMPLE_COMPANIES = [
+    ("51-200 employees", "Computer Software", "Austin, TX"),
+    ("1,001-5,000 employees", "Hospital & Health Care", "Toronto, Canada"),
+]
+
+
+class FakeProvider:
+    """Records prompts per model and reports the common prefix with earlier prompts as cached."""
+
+    def __init__(self):
+        self.prompts = defaultdict(list)
+
+    def cached_chars(self, model: str, prompt: str) -> int:
+        longest = 0
+        for previous in self.prompts[model]:
+            length = 0
+            for a, b in zip(previous, prompt):
+                if a != b:
+                    break
+                length += 1
+            longest = max(longest, length)
+        return longest
+
+    async def reply(self, model: str, prompt: str) -> AIMessage:
+        cached_tokens = estimate_tokens(prompt[: self.cached_chars(model, prompt)])
+        if cached_tokens < MIN_CACHEABLE_TOKENS:
+            cached_tokens = 0
+        self.prompts[model].append(prompt)
+
+        input_tokens = estimate_tokens(prompt)
+        label = "Qualified" if "company info" in prompt else "SDR Strategy"
+        return AIMessage(
+            content=json.dumps({"label": label, "confidence": 0.95}),
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": 10,
+                "total_tokens": input_tokens + 10,
+                "input_token_details": {"cache_read": cached_tokens},
+            },
+        )
+
+
+class FakeModel:
+    def __init__(self, provider: FakeProvider, model: str):
+        self.provider = provider
+        self.model = model
+
+    async def ainvoke(self, messages):
+        return await self.provider.reply(self.model, messages[0]["content"])
+
+
+class FakeRegistry(LLMClientRegistry):
+    def __init__(self, provider: FakeProvider):
+        super().__init__()
+        self.provider = provider
+
+    def get(self, model_name: str, temperature: float = 0.1, max_retries: int = 2) -> FakeModel:
+        return FakeModel(self.provider, model_name)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+async def check() -> list[str]:
+    failures = []
+    provider = FakeProvider()
+
+    job_classifiers = [JobClassifier(limit_rows=None, registry=FakeRegistry(provider)) for _ in range(2)]
+    company_classifiers = [CompanyClassifier(registry=FakeRegistry(provider)) for _ in range(2)]
+
+    for name, classifiers in (("job", job_classifiers), ("company", company_classifiers)):
+        prefixes = {classifier.prompt.prefix for classifier in classifiers}
+        prefix = classifiers[0].prompt.prefix
+        tokens = estimate_tokens(prefix)
+        print(f"{name} prefix: {len(prefix.encode()):,} bytes, ~{tokens:,} tokens, sha256 {_digest(prefix)}")
+        if len(prefixes) != 1:
+            failures.append(f"{name} prefix differs between classifier instances")
+        if tokens < MIN_CACHEABLE_TOKENS:
+            print(f"⚠️ {name} prefix is below the ~{MIN_CACHEABLE_TOKENS} tokens the provider caches implicitly.")
+
+    for classifier in job_classifiers:
+        await classifier.process_dataframe(SAMPLE_JOBS.copy())
+    for classifier in company_classifiers:
+        for size, industry, location in SAMPLE_COMPANIES:
+            await classifier.classify(size, industry, location)
+
+    job_prefix = job_classifiers[0].prompt.prefix
+    company_prefix = company_classifiers[0].prompt.prefix
+    for model, prompts in provider.prompts.items():
+        for prompt in prompts:
+            if not (prompt.startswith(job_prefix) or prompt.startswith(company_prefix)):
+                failures.append(f"a {model} prompt does not start with a static prefix")
+
+    for name, classifiers in (("job", job_classifiers), ("company", company_classifiers)):
+        router = classifiers[0].router
+        usage = router.token_usage[router.tiers[0]]
+        print(f"{name} ({router.tiers[0]}): {usage.summary()}")
+        prefix_tokens = estimate_tokens(classifiers[0].prompt.prefix)
+        if prefix_tokens >= MIN_CACHEABLE_TOKENS and not usage.totals["cached_tokens"]:
+            failures.append(f"{name} prompts got no cached input tokens from the fake provider")
+    return failures
+
+
+def main() -> int:
+    failures = asyncio.run(check())
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        return 1
+    print("✅ Static prompt prefixes are byte-stable.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
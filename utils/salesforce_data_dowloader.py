@@ -2,6 +2,7 @@ import requests
 from simple_salesforce import Salesforce
 import pandas as pd
 import os
+from data_schema.dtypes import read_csv_compact
 
 
 class SalesforceReportDownloader:
@@ -74,9 +75,9 @@ def remove_existing_companies(cleaned_file="/tmp/cleaned_data.csv",
     Removes rows from cleaned_file where company_name exists in the Salesforce report.
     Saves the filtered data back to output_file (overwrites by default).
     """
-    # Load both CSVs
-    cleaned_df = pd.read_csv(cleaned_file)
-    sf_df = pd.read_csv(salesforce_file)
+    # Load both CSVs (only the company column is needed from the report)
+    cleaned_df = read_csv_compact(cleaned_file, stage="filter_existing_companies")
+    sf_df = pd.read_csv(salesforce_file, usecols=["Company / Account"], dtype="category")
 
     # Extract company names from Salesforce
     sf_companies = sf_df["Company / Account"].dropna().unique()
@@ -0,0 +1,63 @@
+import os
+import hashlib
+import pandas as pd
+from rich import print
+from data_schema.dtypes import read_csv_compact, compact_dtypes
+
+# Column carrying each row's position in the filtered dataset, so shard outputs merge back in order
+ROW_ID_COLUMN = "_row_id"
+
+
+def shard_index(value, n_shards: int) -> int:
+    """Stable shard for a key: the same company lands in the same shard on every run and machine."""
+    key = "" if pd.isnull(value) else str(value).strip().lower()
+    digest = hashlib.md5(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % n_shards
+
+
+def shard_path(shard_dir: str, index: int) -> str:
+    return os.path.join(shard_dir, f"shard_{index}.csv")
+
+
+def completed_shard_path(shard_dir: str, index: int) -> str:
+    return os.path.join(shard_dir, f"completed_{index}.csv")
+
+
+def split_into_shards(input_csv: str, n_shards: int, shard_dir: str = "/tmp/shards",
+                      key_col: str = "company_name") -> list[str]:
+    """
+    Partition a CSV into n_shards files by a stable hash of key_col and return their paths.
+    Every shard file is written, even when empty, so shard indexes are always 0..n_shards-1.
+    """
+    df = read_csv_compact(input_csv, stage="split_into_shards")
+    df[ROW_ID_COLUMN] = range(len(df))
+    # object first: mapping a categorical skips missing values, which would drop those rows from every shard
+    shards = df[key_col].astype(object).map(lambda value: shard_index(value, n_shards))
+
+    os.makedirs(shard_dir, exist_ok=True)
+    paths = []
+    for index in range(n_shards):
+        path = shard_path(shard_dir, index)
+        df[shards == index].to_csv(path, index=False)
+        paths.append(path)
+
+    sizes = shards.value_counts().reindex(range(n_shards), fill_value=0).tolist()
+    print(f"✅ Split {len(df)} rows into {n_shards} shards in {shard_dir}: {sizes}")
+    return paths
+
+
+def merge_shards(paths: list[str], output_csv: str) -> str:
+    """Concatenate shard outputs and restore the original row order, independent of finishing order."""
+    missing = [path for path in paths if not os.path.isfile(path)]
+    if missing:
+        raise FileNotFoundError(f"Missing shard outputs: {missing}")
+
+    frames = [read_csv_compact(path) for path in paths]
+    # Empty shards skip the classifiers, so take the column order from the most complete output
+    columns = max(frames, key=lambda frame: len(frame.columns)).columns
+    # Categoricals with different categories per shard concatenate as object, so compact again
+    merged = compact_dtypes(pd.concat(frames, ignore_index=True)[columns])
+    merged = merged.sort_values(ROW_ID_COLUMN, kind="stable").drop(columns=[ROW_ID_COLUMN])
+    merged.to_csv(output_csv, index=False)
+    print(f"✅ Merged {len(paths)} shards ({len(merged)} rows) into {output_csv}")
+    return output_csv
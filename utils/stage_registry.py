@@ -0,0 +1,29 @@
+import importlib
+from functools import cache
+
+# Each pipeline stage is resolved from "module:attribute" (or a whole "module") only when it is first used, so a run
+# that stops early (e.g. no new Drive files) never imports pandas, langchain, dropbox, etc.
+STAGES = {
+    "drive_download": "utils.data_downloader:GoogleDriveDownloader",
+    "preprocess": "utils.data_cleaner:DataPreprocessor",
+    "salesforce_download": "utils.salesforce_data_dowloader:SalesforceReportDownloader",
+    "remove_existing_companies": "utils.salesforce_data_dowloader:remove_existing_companies",
+    "job_classification": "ai_filters.jd_qualifier:JobClassifier",
+    "company_size_fill": "ai_filters.web_search:CompanySizeFiller",
+    "company_classification": "ai_filters.company_classifier:CompanyClassifier",
+    "llm_registry": "ai_filters.llm_clients:get_llm_registry",
+    "dropbox_upload": "utils.dropbox_uploader:DropboxUploader",
+    "delta_export": "utils.delta_export:DeltaExporter",
+    "sharding": "utils.sharding",
+    "drive_watcher": "utils.drive_watcher",
+}
+
+
+@cache
+def load_stage(name: str):
+    """Import and return the class, function or module registered for a pipeline stage."""
+    if name not in STAGES:
+        raise KeyError(f"Unknown pipeline stage: '{name}'")
+    module_path, _, attribute = STAGES[name].partition(":")
+    module = importlib.import_module(module_path)
+    return getattr(module, attribute) if attribute else module
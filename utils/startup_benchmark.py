@@ -0,0 +1,69 @@
+"""
+Guard the cold-start cost of `python main.py`.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, reports the slowest imports and
+fails when the total exceeds the budget or when a heavy stage dependency is imported at startup.
+
+Usage: python -m utils.startup_benchmark --budget-ms 150
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# Stage dependencies that must only be imported once their stage runs (see utils/stage_registry.py)
+HEAVY_MODULES = [
+    "pandas", "langchain", "langchain_core", "langchain_google_genai", "langchain_tavily",
+    "langgraph", "googleapiclient", "dropbox", "simple_salesforce",
+]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(module: str = "main") -> list[tuple[str, int, int]]:
+    """Return (module, cumulative_us, depth) for every import made by `import <module>`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            imports.append((name, int(cumulative), (len(indent) - 1) // 2))
+    return imports
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    imports = measure_imports(args.module)
+    total_ms = sum(cumulative for _, cumulative, depth in imports if depth == 0) / 1000
+
+    print(f"Slowest top-level imports for '{args.module}':")
+    top_level = sorted((i for i in imports if i[2] == 0), key=lambda i: i[1], reverse=True)
+    for name, cumulative, _ in top_level[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print(f"Total: {total_ms:.1f} ms (budget {args.budget_ms:.1f} ms)")
+
+    imported = {name.split(".")[0] for name, _, _ in imports}
+    eager = sorted(imported.intersection(HEAVY_MODULES))
+    if eager:
+        print(f"❌ Heavy stage dependencies imported at startup: {', '.join(eager)}")
+        return 1
+    if total_ms > args.budget_ms:
+        print("❌ Startup import time is over budget.")
+        return 1
+    print("✅ Startup import time within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())